@@ -0,0 +1,112 @@
+"""Measure how long saving extracted items to Appwrite takes, and how it stalls the loop
+
+The Appwrite SDK is replaced by a fake whose calls block for --rtt seconds, like the
+real synchronous SDK waiting on the network. "sequential" reproduces the old flow:
+for each item, upload the file, write its metadata and create the item document one
+after another on the event loop. "concurrent" runs ExtractionPipeline._save_item for
+every item at once, with SDK calls on AppwriteService's thread pool.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_appwrite_persist [--items 10] [--rtt 0.15]
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+import types
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("APPWRITE_API_KEY", "benchmark")
+
+import numpy as np
+
+from benchmarks.bench_decode_offload import probe
+from services.appwrite_service import AppwriteService
+from services.extraction_pipeline import ExtractionPipeline
+from services.video_processor import VideoProcessor
+
+
+class FakeSDK:
+    """Blocking stand-ins for Storage and Databases calls"""
+    
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.calls = 0
+    
+    def call(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.rtt)
+        return {"$id": f"doc_{self.calls}"}
+
+
+async def save_sequential(service: AppwriteService, sdk: FakeSDK, items: list):
+    for item in items:
+        sdk.call(file=base64.b64decode(item["image"]))
+        sdk.call(data={"image_type": "item_frame"})
+        sdk.call(data={"name": item["name"]})
+
+
+async def save_concurrent(service: AppwriteService, sdk: FakeSDK, items: list):
+    processor = types.SimpleNamespace(
+        resolve_image=lambda item, prefer_original: item["image"],
+        resolve_mime_type=lambda item, prefer_original: "image/jpeg"
+    )
+    pipeline = ExtractionPipeline(processor, service)
+    await asyncio.gather(*(pipeline._save_item(item) for item in items))
+
+
+async def measure(name: str, save, service: AppwriteService, sdk: FakeSDK, items: list) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+    await asyncio.sleep(0.05)
+    
+    calls = sdk.calls
+    start = time.perf_counter()
+    await save(service, sdk, items)
+    elapsed = time.perf_counter() - start
+    
+    stop.set()
+    await probe_task
+    
+    return {
+        'mode': name,
+        'elapsed': elapsed,
+        'calls': sdk.calls - calls,
+        'failed': sum(1 for item in items if item.get("save_error")),
+        'lag_max': max(lags)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--rtt', type=float, default=0.15, help="seconds each fake SDK call blocks")
+    args = parser.parse_args()
+    
+    sdk = FakeSDK(args.rtt)
+    service = AppwriteService()
+    service.storage = types.SimpleNamespace(create_file=sdk.call, delete_file=sdk.call)
+    service.databases = types.SimpleNamespace(create_document=sdk.call, delete_document=sdk.call)
+    
+    image = base64.b64encode(os.urandom(50_000)).decode('utf-8')
+    items = [{"id": f"item_{n}", "name": f"item {n}", "category": "decor", "estimated_price": 20, "image": image}
+             for n in range(args.items)]
+    
+    rows = [
+        await measure("sequential", save_sequential, service, sdk, items),
+        await measure("concurrent", save_concurrent, service, sdk, items)
+    ]
+    
+    print()
+    print(f"{args.items} items, {args.rtt * 1000:.0f}ms per Appwrite call, {service.executor._max_workers} SDK threads")
+    print(f"{'mode':>11} {'elapsed':>8} {'calls':>6} {'failed':>7} {'lag max':>9}")
+    for row in rows:
+        print(f"{row['mode']:>11} {row['elapsed']:>7.2f}s {row['calls']:>6} {row['failed']:>7} {row['lag_max']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Measure event loop stalls while sell-mode videos are being decoded
+
+A probe coroutine stands in for /api/buy/* traffic: it wakes every few milliseconds
+and records how late it was scheduled, which is the delay every other request on the
+loop would see. Frames are extracted from synthetic clips either inline on the loop
+(how frame extraction used to run) or one frame at a time on VideoProcessor.decode_pool,
+as ExtractionPipeline does.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_decode_offload [--videos 2] [--duration 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+import numpy as np
+
+from benchmarks.bench_frame_sampling import decode_frames, make_clip
+from services.video_processor import VideoProcessor
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def extract_inline(processor: VideoProcessor, video_path: str):
+    return list(processor.iter_frames(video_path))
+
+
+async def extract_pooled(processor: VideoProcessor, video_path: str):
+    return await decode_frames(processor, video_path)
+
+
+async def measure(name: str, extract, processor: VideoProcessor, paths: list) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(extract(processor, path) for path in paths))
+    elapsed = time.perf_counter() - start
+    
+    stop.set()
+    await probe_task
+    
+    return {
+        'mode': name,
+        'elapsed': elapsed,
+        'p50': float(np.percentile(lags, 50)),
+        'p99': float(np.percentile(lags, 99)),
+        'max': max(lags)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=2, help="videos extracted concurrently")
+    parser.add_argument('--duration', type=int, default=20)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--fps', type=int, default=30)
+    args = parser.parse_args()
+    
+    processor = VideoProcessor()
+    paths = [make_clip(args.duration, args.width, args.height, args.fps) for _ in range(args.videos)]
+    
+    try:
+        rows = [
+            await measure("inline", extract_inline, processor, paths),
+            await measure("pool", extract_pooled, processor, paths)
+        ]
+    finally:
+        for path in paths:
+            os.remove(path)
+    
+    print()
+    print(f"{args.videos} x {args.duration}s clips at {args.width}x{args.height}, {processor.decode_pool.workers} decode workers")
+    print(f"{'mode':>8} {'elapsed':>8} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for row in rows:
+        print(f"{row['mode']:>8} {row['elapsed']:>7.2f}s {row['p50']:>7.1f}ms {row['p99']:>7.1f}ms {row['max']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
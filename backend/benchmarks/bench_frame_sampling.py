@@ -0,0 +1,104 @@
+"""Compare sequential, seek-based and scene-change frame sampling in VideoProcessor.iter_frames
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_frame_sampling [--durations 10 30 60] [--width 1920 --height 1080]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+import cv2
+import numpy as np
+
+from services.video_processor import VideoProcessor
+
+
+def make_clip(duration: int, width: int, height: int, fps: int) -> str:
+    """Render a synthetic clip with moving content so every frame differs; returns its path"""
+    
+    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
+        path = temp_file.name
+    
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    
+    for i in range(duration * fps):
+        frame = np.roll(background, i * 4, axis=1)
+        cv2.putText(frame, str(i), (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+        writer.write(frame)
+    writer.release()
+    
+    return path
+
+
+async def decode_frames(processor: VideoProcessor, path: str, sampling_mode: str = None) -> list:
+    """Decode a clip the way ExtractionPipeline does: one frame at a time on the decode pool"""
+    
+    frames = processor.iter_frames(path, sampling_mode)
+    decoded = []
+    try:
+        while True:
+            frame_info = await processor.decode_pool.run(next, frames, None)
+            if frame_info is None:
+                return decoded
+            decoded.append(frame_info)
+    finally:
+        frames.close()
+
+
+async def time_mode(processor: VideoProcessor, path: str, mode: str, repeats: int) -> tuple:
+    best = float('inf')
+    frames = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = await decode_frames(processor, path, mode)
+        best = min(best, time.perf_counter() - start)
+    return best, frames
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--durations', type=int, nargs='+', default=[10, 30, 60])
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    processor = VideoProcessor()
+    rows = []
+    
+    for duration in args.durations:
+        print(f"Rendering {duration}s clip at {args.width}x{args.height}...")
+        path = make_clip(duration, args.width, args.height, args.fps)
+        
+        seq_time, seq_frames = await time_mode(processor, path, "sequential", args.repeats)
+        seek_time, seek_frames = await time_mode(processor, path, "seek", args.repeats)
+        scene_time, scene_frames = await time_mode(processor, path, "scene", args.repeats)
+        os.unlink(path)
+        
+        rows.append((
+            duration,
+            seq_time,
+            seek_time,
+            scene_time,
+            [round(f['timestamp'], 1) for f in seq_frames],
+            [round(f['timestamp'], 1) for f in seek_frames],
+            [round(f['timestamp'], 1) for f in scene_frames],
+        ))
+    
+    print()
+    print(f"{'clip':>6} {'sequential':>12} {'seek':>10} {'scene':>10}  timestamps (sequential | seek | scene)")
+    for duration, seq_time, seek_time, scene_time, seq_ts, seek_ts, scene_ts in rows:
+        print(f"{duration:>5}s {seq_time:>11.3f}s {seek_time:>9.3f}s {scene_time:>9.3f}s  {seq_ts} | {seek_ts} | {scene_ts}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
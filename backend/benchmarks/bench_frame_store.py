@@ -0,0 +1,103 @@
+"""Compare status payload size and retained memory with and without the frame store
+
+Runs the extraction pipeline on a synthetic clip with the mocked vision model, then
+measures the job as stored now (frames/items referencing FrameStore images) against
+the previous inline representation, where every frame and item embedded its base64
+image and each item carried its frame's raw model response.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_frame_store [--duration 30] [--frames 12]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import tracemalloc
+import types
+
+# The services read API keys at import time; mocked runs never call the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+import config
+from benchmarks.bench_frame_sampling import make_clip
+from benchmarks.bench_pipeline import MockAppwrite
+from benchmarks.bench_vision_batching import MockCompletions
+from services.extraction_pipeline import ExtractionPipeline
+from services.video_processor import VideoProcessor
+
+
+def inline_job(processor: VideoProcessor, job: dict, ai_response: str) -> dict:
+    """Rebuild the job the way it was held before frames and items referenced the store"""
+    
+    frames = []
+    for frame in job["frames"]:
+        entry = {key: value for key, value in frame.items() if key != "frame_ref"}
+        entry["frame_data"] = processor.resolve_image(frame)
+        frames.append(entry)
+    
+    items = []
+    for item in job["items"]:
+        entry = {key: value for key, value in item.items() if key not in ("frame_ref", "original_frame_ref")}
+        entry["frame_data"] = processor.resolve_image(item)
+        entry["ai_response"] = ai_response
+        items.append(entry)
+    
+    return {**job, "frames": frames, "items": items}
+
+
+def retained_bytes(build) -> tuple:
+    """Bytes still allocated after build() returns, keeping its result alive"""
+    
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=int, default=30)
+    parser.add_argument('--frames', type=int, default=12, help="FRAME_SAMPLE_COUNT for the run")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    args = parser.parse_args()
+    
+    config.FRAME_SAMPLE_COUNT = args.frames
+    processor = VideoProcessor()
+    mock = MockCompletions(0.0, 0.0)
+    processor.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=mock))
+    
+    video_path = make_clip(args.duration, args.width, args.height, 30)
+    try:
+        job = {"progress": 0}
+        await ExtractionPipeline(processor, MockAppwrite(0.0), user_id="bench").run(job, video_path)
+    finally:
+        os.remove(video_path)
+    
+    # A typical model reply runs to a couple of KB per frame
+    ai_response = json.dumps([{"object_name": "item", "description": "x" * 200}] * 8)
+    
+    stored_payload = json.dumps({"frames": job["frames"], "items": job["items"]})
+    inline, inline_memory = retained_bytes(lambda: inline_job(processor, job, ai_response))
+    inline_payload = json.dumps({"frames": inline["frames"], "items": inline["items"]})
+    del inline
+    
+    # Only the images the job references count against the store
+    refs = {entry.get(key) for entry in job["frames"] + job["items"] for key in ("frame_ref", "original_frame_ref")} - {None}
+    stored_memory = sum(len(processor.frame_store.get(ref)) for ref in refs)
+    _, job_memory = retained_bytes(lambda: json.loads(json.dumps(job)))
+    
+    print()
+    print(f"{len(job['frames'])} frames, {len(job['items'])} items, {len(refs)} stored images")
+    print(f"{'layout':>8} {'status payload':>15} {'retained':>10}")
+    print(f"{'inline':>8} {len(inline_payload) / 1024:>12.1f} KB {inline_memory / 1024:>7.1f} KB")
+    print(f"{'store':>8} {len(stored_payload) / 1024:>12.1f} KB {(job_memory + stored_memory) / 1024:>7.1f} KB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""Compare a burst of extraction jobs run all at once with the bounded JobScheduler
+
+Every job runs the real ExtractionPipeline on a synthetic clip with the vision model
+and Appwrite mocked. "unbounded" starts every job immediately, the way FastAPI
+BackgroundTasks did; "scheduled" lets JobScheduler run --concurrency at a time. A
+probe coroutine records event loop lag, the delay every other request would see.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_job_scheduler [--jobs 8] [--concurrency 2]
+"""
+import argparse
+import asyncio
+import os
+import time
+import types
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("APPWRITE_API_KEY", "benchmark")
+
+import numpy as np
+
+from benchmarks.bench_decode_offload import probe
+from benchmarks.bench_frame_sampling import make_clip
+from benchmarks.bench_pipeline import MockAppwrite
+from benchmarks.bench_vision_batching import MockCompletions
+from services.extraction_pipeline import ExtractionPipeline
+from services.job_scheduler import JobScheduler
+from services.video_processor import VideoProcessor
+
+
+async def measure(name: str, max_concurrent: int, processor: VideoProcessor, args, video_path: str) -> dict:
+    appwrite = MockAppwrite(args.save_latency)
+    scheduler = JobScheduler(max_concurrent=max_concurrent, timeout=3600)
+    finished_at = {}
+    all_done = asyncio.Event()
+    
+    async def run_job(job_id: str):
+        await ExtractionPipeline(processor, appwrite).run({}, video_path)
+        finished_at[job_id] = time.perf_counter()
+        if len(finished_at) == args.jobs:
+            all_done.set()
+    
+    stop = asyncio.Event()
+    lags = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+    
+    start = time.perf_counter()
+    for n in range(args.jobs):
+        scheduler.submit(f"job_{n}", lambda job_id=f"job_{n}": run_job(job_id))
+    await all_done.wait()
+    
+    stop.set()
+    await probe_task
+    
+    latencies = [finished - start for finished in finished_at.values()]
+    return {
+        'mode': name,
+        'first': min(latencies),
+        'p50': float(np.percentile(latencies, 50)),
+        'last': max(latencies),
+        'lag_p99': float(np.percentile(lags, 99))
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=8, help="uploads arriving at once")
+    parser.add_argument('--concurrency', type=int, default=2, help="EXTRACTION_MAX_CONCURRENT_JOBS for the scheduled run")
+    parser.add_argument('--duration', type=int, default=10, help="synthetic clip length in seconds")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--vision-concurrency', type=int, default=4, help="in-flight request cap (VISION_MAX_CONCURRENCY)")
+    parser.add_argument('--overhead', type=float, default=1.0, help="mock seconds per vision request")
+    parser.add_argument('--save-latency', type=float, default=0.2, help="mock seconds per Appwrite item")
+    args = parser.parse_args()
+    
+    processor = VideoProcessor()
+    processor.vision_semaphore = asyncio.Semaphore(args.vision_concurrency)
+    processor.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=MockCompletions(args.overhead, 0.5)))
+    
+    video_path = make_clip(args.duration, args.width, args.height, args.fps)
+    try:
+        rows = [
+            await measure("unbounded", args.jobs, processor, args, video_path),
+            await measure("scheduled", args.concurrency, processor, args, video_path)
+        ]
+    finally:
+        os.remove(video_path)
+    
+    print()
+    print(f"{args.jobs} jobs at once, {args.duration}s clips at {args.width}x{args.height}, mocked model and Appwrite")
+    print(f"{'mode':>10} {'first done':>11} {'median done':>12} {'last done':>10} {'lag p99':>9}")
+    for row in rows:
+        print(f"{row['mode']:>10} {row['first']:>10.2f}s {row['p50']:>11.2f}s {row['last']:>9.2f}s {row['lag_p99']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
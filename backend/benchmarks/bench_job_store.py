@@ -0,0 +1,84 @@
+"""Show retained memory as extraction jobs accumulate, with and without the job store
+
+Simulates a long-running worker finishing many jobs. The unbounded dict is how
+extraction_jobs used to be kept; MemoryJobStore applies JOB_STORE_MAX_JOBS /
+JOB_STORE_MAX_BYTES, and SharedJobStore on the SQLite state backend keeps
+finished jobs on disk only.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_job_store [--jobs 5000] [--max-jobs 500]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+import uuid
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from services.job_store import MemoryJobStore, SharedJobStore
+from services.state_backend import SQLiteStateBackend
+
+
+def finished_job(frames: int, items: int) -> dict:
+    """A completed job shaped like the pipeline's output (images referenced, not embedded)"""
+    
+    return {
+        "status": "completed",
+        "progress": 100,
+        "filename": "walkthrough.mp4",
+        "frames": [
+            {"id": f"frame_{i}", "timestamp": i * 2.0, "frame_ref": uuid.uuid4().hex * 2, "phash": "0f" * 8,
+             "quality": {"sharpness": 120.5, "brightness": 110.0, "clipped": 0.01, "exposure_ok": True}, "items": []}
+            for i in range(frames)
+        ],
+        "items": [
+            {"id": f"item_{i}", "name": "office chair", "category": "furniture", "frame_ref": uuid.uuid4().hex * 2,
+             "confidence": 0.9, "estimated_price": 40.0, "description": "A mesh office chair in good condition"}
+            for i in range(items)
+        ],
+        "error": None
+    }
+
+
+def run(store, jobs: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(jobs):
+        job_id = str(uuid.uuid4())
+        job = finished_job(5, 6)
+        if isinstance(store, dict):
+            store[job_id] = job
+        else:
+            store.create(job_id, job)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--max-jobs', type=int, default=500)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        rows = [
+            ("dict", run({}, args.jobs)),
+            ("memory", run(MemoryJobStore(max_jobs=args.max_jobs), args.jobs)),
+            ("sqlite", run(SharedJobStore(SQLiteStateBackend(os.path.join(directory, "state.sqlite3"))), args.jobs))
+        ]
+    
+    print()
+    print(f"{args.jobs} finished jobs, store limit {args.max_jobs} jobs")
+    print(f"{'store':>8} {'retained':>10}")
+    for name, retained in rows:
+        print(f"{name:>8} {retained / 1024 / 1024:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
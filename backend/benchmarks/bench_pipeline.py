@@ -0,0 +1,128 @@
+"""Compare the staged extraction flow with the streaming ExtractionPipeline
+
+The staged flow decodes every frame, then runs detection, then saves items one by
+one - the shape process_video_extraction had before the pipeline. Both runs use a
+synthetic clip, the mocked vision model from bench_vision_batching and a mocked
+Appwrite service with fixed upload/save latency, and report time to first saved
+item and total latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pipeline [--duration 30] [--overhead 1.5] [--save-latency 0.3]
+"""
+import argparse
+import asyncio
+import os
+import time
+import types
+
+# The services read API keys at import time; mocked runs never call the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from benchmarks.bench_frame_sampling import decode_frames, make_clip
+from benchmarks.bench_vision_batching import MockCompletions
+from services.extraction_pipeline import ExtractionPipeline
+from services.video_processor import SellableItemCollector, VideoProcessor
+
+
+class MockAppwrite:
+    """Stands in for AppwriteService, recording when each item was saved"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.saved_at = []
+    
+    def new_file(self):
+        file_id = f"file_{time.perf_counter_ns()}"
+        return file_id, f"https://example.invalid/{file_id}"
+    
+    async def upload_image(self, image_data, user_id, image_type, original_filename, file_id=None, mime_type="image/jpeg"):
+        await asyncio.sleep(self.latency / 2)
+        return f"https://example.invalid/{file_id or original_filename}"
+    
+    async def save_extracted_item(self, item, user_id, image_url):
+        await asyncio.sleep(self.latency / 2)
+        self.saved_at.append(time.perf_counter())
+        return f"doc_{len(self.saved_at)}"
+    
+    async def delete_extracted_item(self, item_doc_id):
+        pass
+    
+    async def delete_image(self, file_id):
+        pass
+
+
+async def run_staged(processor: VideoProcessor, appwrite: MockAppwrite, video_path: str) -> list:
+    frames = await decode_frames(processor, video_path)
+    unique_frames = []
+    for frame_info in frames:
+        if not processor.find_duplicate_frame(frame_info, unique_frames):
+            unique_frames.append(frame_info)
+    detected_objects = await processor.detect_objects(unique_frames)
+    
+    collector = SellableItemCollector(processor.frame_store)
+    for obj in detected_objects:
+        collector.add(obj)
+    items = collector.items
+    
+    for item in items:
+        image_url = await appwrite.upload_image(processor.resolve_image(item), "bench", "item_frame", f"{item['name']}_frame.jpg")
+        await appwrite.save_extracted_item(item, "bench", image_url)
+    return items
+
+
+async def run_pipeline(processor: VideoProcessor, appwrite: MockAppwrite, video_path: str) -> list:
+    job = {"progress": 0}
+    return await ExtractionPipeline(processor, appwrite, user_id="bench").run(job, video_path)
+
+
+async def measure(name: str, runner, processor: VideoProcessor, args, video_path: str) -> dict:
+    appwrite = MockAppwrite(args.save_latency)
+    
+    start = time.perf_counter()
+    items = await runner(processor, appwrite, video_path)
+    total = time.perf_counter() - start
+    
+    return {
+        'flow': name,
+        'items': len(items),
+        'first_item': appwrite.saved_at[0] - start if appwrite.saved_at else float('nan'),
+        'total': total
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=int, default=30, help="synthetic clip length in seconds")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=2, help="in-flight request cap (VISION_MAX_CONCURRENCY)")
+    parser.add_argument('--overhead', type=float, default=1.5, help="mock seconds per vision request")
+    parser.add_argument('--seconds-per-mb', type=float, default=0.5, help="mock upload/inference cost")
+    parser.add_argument('--save-latency', type=float, default=0.3, help="mock seconds per Appwrite item")
+    args = parser.parse_args()
+    
+    processor = VideoProcessor()
+    processor.vision_semaphore = asyncio.Semaphore(args.concurrency)
+    mock = MockCompletions(args.overhead, args.seconds_per_mb)
+    processor.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=mock))
+    
+    video_path = make_clip(args.duration, args.width, args.height, args.fps)
+    try:
+        rows = [
+            await measure("staged", run_staged, processor, args, video_path),
+            await measure("pipeline", run_pipeline, processor, args, video_path)
+        ]
+    finally:
+        os.remove(video_path)
+    
+    print()
+    print(f"{args.duration}s clip at {args.width}x{args.height}, concurrency {args.concurrency}, mocked model and Appwrite")
+    print(f"{'flow':>10} {'items':>6} {'first item':>11} {'total':>8}")
+    for row in rows:
+        print(f"{row['flow']:>10} {row['items']:>6} {row['first_item']:>10.2f}s {row['total']:>7.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
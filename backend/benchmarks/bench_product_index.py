@@ -0,0 +1,96 @@
+"""Measure local product index lookups against Tavily round trips
+
+Fills a fresh ProductIndex with --products synthetic products, then runs
+search_specific_product for --lookups product names: once against an empty index
+(every lookup goes to the fake Tavily client) and once against the filled index.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_product_index [--products 50000] [--lookups 200] [--latency 0.8]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from benchmarks.bench_product_search import FakeTavily
+from services.product_index import ProductIndex
+from services.product_search import ProductSearchService
+
+ADJECTIVES = ["brass", "oak", "linen", "velvet", "rattan", "ceramic", "marble", "walnut", "wool", "glass", "boucle", "jute"]
+ITEMS = ["floor lamp", "table lamp", "area rug", "throw pillow", "side table", "bookshelf", "mirror", "planter",
+         "curtains", "armchair", "pendant light", "vase", "ottoman", "wall art", "blanket", "sconce"]
+STORES = ["amazon.com", "wayfair.com", "target.com", "ikea.com", "cb2.com", "crateandbarrel.com"]
+
+
+def synthetic_products(count: int) -> list:
+    rng = random.Random(0)
+    products = []
+    for n in range(count):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)}"
+        products.append({
+            "title": f"{name.title()} - Model {n}",
+            "url": f"https://www.{rng.choice(STORES)}/p/{n}",
+            "description": f"A {name} for living rooms and bedrooms...",
+            "store": "Online Store",
+            "category": "home decor",
+            "suggestion_item": name
+        })
+    return products
+
+
+async def measure(service: ProductSearchService, names: list) -> dict:
+    calls = service.client.calls
+    latencies = []
+    for name in names:
+        start = time.perf_counter()
+        await service.search_specific_product(name, "home decor")
+        latencies.append(time.perf_counter() - start)
+    return {
+        'median_ms': statistics.median(latencies) * 1000,
+        'p95_ms': sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        'calls': service.client.calls - calls
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.8, help="mean seconds per Tavily query")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    # Each name once, so the search cache never answers
+    names = [f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} {n}" for n in range(args.lookups)]
+    names_without_suffix = [name.rsplit(' ', 1)[0] for name in names]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        service = ProductSearchService()
+        service.client = FakeTavily(args.latency, 3)
+        
+        service.index = ProductIndex(os.path.join(directory, "empty.sqlite3"))
+        empty = await measure(service, names)
+        
+        service.index = ProductIndex(os.path.join(directory, "filled.sqlite3"))
+        start = time.perf_counter()
+        service.index.add(synthetic_products(args.products))
+        build_seconds = time.perf_counter() - start
+        service.cache._entries.clear()
+        filled = await measure(service, names_without_suffix)
+    
+    print()
+    print(f"{args.lookups} lookups, {args.latency:.1f}s mean Tavily latency, {args.products} indexed products (built in {build_seconds:.2f}s)")
+    print(f"{'index':>7} {'median':>10} {'p95':>10} {'tavily calls':>13}")
+    for label, row in (("empty", empty), ("filled", filled)):
+        print(f"{label:>7} {row['median_ms']:>8.2f}ms {row['p95_ms']:>8.2f}ms {row['calls']:>13}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""Compare serial and concurrent Tavily queries in ProductSearchService.search_products
+
+The Tavily client is replaced by a fake that blocks for a random latency, like the
+real synchronous client, and returns --results hits per query. "serial" issues the
+queries one after another the way search_products used to; "concurrent" is the
+current implementation. Both must return the same products in the same order
+(serial keeps the first PRODUCTS_PER_SUGGESTION per suggestion, as the ranking does
+when every result scores the same).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_product_search [--suggestions 5] [--latency 0.8] [--results 1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from services.product_search import ProductSearchService
+
+
+class FakeTavily:
+    """Blocking stand-in for TavilyClient.search"""
+    
+    def __init__(self, latency: float, results: int):
+        self.latency = latency
+        self.results = results
+        self.calls = 0
+    
+    def search(self, query, max_results=5, **kwargs):
+        self.calls += 1
+        # Deterministic per query, so both runs see the same latencies
+        time.sleep(self.latency * random.Random(query).uniform(0.5, 1.5))
+        return {"results": [
+            {"title": f"{query} #{n}", "url": f"https://www.example.com/{query.replace(' ', '-')}/{n}", "content": "mock"}
+            for n in range(min(self.results, max_results))
+        ]}
+
+
+async def search_serial(service: ProductSearchService, suggestions: list) -> list:
+    products = []
+    for suggestion in suggestions:
+        found = []
+        for query in (f"{suggestion['item']} buy online", f"shop {suggestion['item']} home decor"):
+            response = service.client.search(query=query, search_depth="basic", max_results=3)
+            found += [
+                {"title": result['title'], "url": result['url'], "suggestion_item": suggestion['item']}
+                for result in response['results']
+            ]
+            if len(found) >= service.PRODUCTS_PER_SUGGESTION:
+                break
+        products += found[:service.PRODUCTS_PER_SUGGESTION]
+    return products
+
+
+async def search_concurrent(service: ProductSearchService, suggestions: list) -> list:
+    products = await service.search_products(suggestions)
+    return [{"title": p['title'], "url": p['url'], "suggestion_item": p['suggestion_item']} for p in products]
+
+
+async def measure(name: str, search, service: ProductSearchService, suggestions: list) -> dict:
+    calls = service.client.calls
+    start = time.perf_counter()
+    products = await search(service, suggestions)
+    return {'mode': name, 'elapsed': time.perf_counter() - start, 'calls': service.client.calls - calls, 'products': products}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suggestions', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.8, help="mean seconds per Tavily query")
+    parser.add_argument('--results', type=int, default=1, help="hits per query; 2 or more skips the second query")
+    args = parser.parse_args()
+    
+    service = ProductSearchService()
+    service.client = FakeTavily(args.latency, args.results)
+    suggestions = [{"item": f"item{n}", "category": "decor", "priority": "high"} for n in range(args.suggestions)]
+    
+    rows = [
+        await measure("serial", search_serial, service, suggestions),
+        await measure("concurrent", search_concurrent, service, suggestions)
+    ]
+    
+    print()
+    print(f"{args.suggestions} suggestions, {args.latency:.1f}s mean Tavily latency, {args.results} hits per query")
+    print(f"{'mode':>11} {'elapsed':>8} {'queries':>8} {'products':>9}")
+    for row in rows:
+        print(f"{row['mode']:>11} {row['elapsed']:>7.2f}s {row['calls']:>8} {len(row['products']):>9}")
+    print(f"same products in the same order: {rows[0]['products'] == rows[1]['products']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
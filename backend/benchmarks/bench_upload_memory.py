@@ -0,0 +1,93 @@
+"""Peak memory of concurrent video uploads: buffering whole files vs chunked spooling
+
+Simulates N simultaneous uploads reaching /api/sell/upload-video and measures the
+peak Python heap (tracemalloc) for the old path (file.read() into memory, then a
+second copy written to a temp file) and the new spool_upload path.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_upload_memory [--uploads 10] [--size-mb 100]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+# The services read API keys at import time; the benchmark never calls the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from services.upload_spool import spool_upload, remove_spool_file
+
+
+def make_source(size_mb: int) -> str:
+    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as source:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            source.write(block)
+        return source.name
+
+
+def open_upload(path: str) -> UploadFile:
+    """An UploadFile backed by a file on disk, like Starlette's rolled-over spooled upload"""
+    return UploadFile(
+        file=open(path, 'rb'),
+        size=os.path.getsize(path),
+        filename="walkthrough.mp4",
+        headers=Headers({"content-type": "video/mp4"})
+    )
+
+
+async def buffered_upload(upload: UploadFile) -> str:
+    """The previous behaviour: whole file in memory, then copied again to a temp file"""
+    video_data = await upload.read()
+    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
+        temp_file.write(video_data)
+        return temp_file.name
+
+
+async def measure(handler, source: str, uploads: int) -> tuple:
+    files = [open_upload(source) for _ in range(uploads)]
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    paths = await asyncio.gather(*(handler(upload) for upload in files))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    for upload in files:
+        await upload.close()
+    for path in paths:
+        remove_spool_file(path)
+    
+    return peak, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=10)
+    parser.add_argument('--size-mb', type=int, default=100)
+    args = parser.parse_args()
+    
+    source = make_source(args.size_mb)
+    try:
+        rows = [
+            ("buffered", *await measure(buffered_upload, source, args.uploads)),
+            ("spooled", *await measure(spool_upload, source, args.uploads)),
+        ]
+    finally:
+        os.unlink(source)
+    
+    print(f"{args.uploads} concurrent uploads of {args.size_mb}MB")
+    print(f"{'mode':>10} {'peak heap':>12} {'elapsed':>9}")
+    for mode, peak, elapsed in rows:
+        print(f"{mode:>10} {peak / 1024 / 1024:>10.1f}MB {elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
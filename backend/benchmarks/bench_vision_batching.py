@@ -0,0 +1,150 @@
+"""Compare per-frame and mosaic vision requests in VideoProcessor.detect_objects
+
+By default the Nebius client is replaced with a mock whose latency is a fixed
+per-request overhead plus a cost per uploaded megabyte, so the numbers show the
+effect of request count and payload size. Pass --live (with real API keys in
+the environment) and --video to measure against the real model instead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_vision_batching [--frames 8] [--concurrency 2]
+    python -m benchmarks.bench_vision_batching --live --video walkthrough.mp4
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import time
+import types
+
+# The services read API keys at import time; mocked runs never call the APIs
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+import cv2
+import numpy as np
+
+import config
+from benchmarks.bench_frame_sampling import decode_frames
+from services.video_processor import SellableItemCollector, VideoProcessor
+
+ITEMS_PER_FRAME = 2
+
+
+class MockCompletions:
+    """Stands in for AsyncOpenAI.chat.completions with a simple latency model"""
+    
+    def __init__(self, overhead: float, seconds_per_mb: float):
+        self.overhead = overhead
+        self.seconds_per_mb = seconds_per_mb
+        self.requests = 0
+        self.bytes_sent = 0
+    
+    async def create(self, **kwargs):
+        content = kwargs['messages'][0]['content']
+        prompt = content[0]['text']
+        image_bytes = len(content[1]['image_url']['url']) * 3 // 4
+        
+        self.requests += 1
+        request_number = self.requests
+        self.bytes_sent += image_bytes
+        await asyncio.sleep(self.overhead + self.seconds_per_mb * image_bytes / 1e6)
+        
+        match = re.search(r"grid of (\d+) video frames", prompt)
+        tiles = int(match.group(1)) if match else 1
+        items = [
+            {
+                "tile": tile,
+                "object_name": f"item {request_number}-{tile}-{n}",
+                "category": "decor",
+                "confidence": 0.9,
+                "condition": "good",
+                "estimated_value": 40,
+                "description": "mock item"
+            }
+            for tile in range(tiles) for n in range(ITEMS_PER_FRAME)
+        ]
+        message = types.SimpleNamespace(content=json.dumps(items))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def synthetic_frames(count: int, width: int, height: int) -> list:
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        image = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+        _, buffer = cv2.imencode('.jpg', image)
+        frames.append({
+            'id': f"frame_{i}",
+            'timestamp': float(i * 2),
+            'frame_data': base64.b64encode(buffer).decode('utf-8'),
+            'items': []
+        })
+    return frames
+
+
+async def run_mode(processor: VideoProcessor, frames: list, mode: str, mock: MockCompletions = None) -> dict:
+    if mock:
+        mock.requests = 0
+        mock.bytes_sent = 0
+    
+    start = time.perf_counter()
+    detected = await processor.detect_objects(frames, batch_mode=mode)
+    elapsed = time.perf_counter() - start
+    
+    collector = SellableItemCollector(processor.frame_store)
+    for obj in detected:
+        collector.add(obj)
+    unique = collector.items
+    requests = mock.requests if mock else (
+        len(frames) if mode == "per_frame" else -(-len(frames) // config.VISION_MOSAIC_TILES)
+    )
+    
+    return {
+        'mode': mode,
+        'requests': requests,
+        'items': len(unique),
+        'items_per_request': len(unique) / max(1, requests),
+        'latency': elapsed,
+        'mb_sent': mock.bytes_sent / 1e6 if mock else None
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=8)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--concurrency', type=int, default=2, help="in-flight request cap (VISION_MAX_CONCURRENCY)")
+    parser.add_argument('--overhead', type=float, default=1.5, help="mock seconds per request")
+    parser.add_argument('--seconds-per-mb', type=float, default=0.5, help="mock upload/inference cost")
+    parser.add_argument('--video', help="extract frames from this video instead of synthesizing them")
+    parser.add_argument('--live', action='store_true', help="call the real vision model")
+    args = parser.parse_args()
+    
+    processor = VideoProcessor()
+    processor.vision_semaphore = asyncio.Semaphore(args.concurrency)
+    
+    mock = None
+    if not args.live:
+        mock = MockCompletions(args.overhead, args.seconds_per_mb)
+        processor.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=mock))
+    
+    if args.video:
+        frames = await decode_frames(processor, args.video)
+    else:
+        frames = synthetic_frames(args.frames, args.width, args.height)
+    
+    rows = [await run_mode(processor, frames, mode, mock) for mode in ("per_frame", "mosaic")]
+    
+    print()
+    print(f"{len(frames)} frames, concurrency {args.concurrency}, {'live' if args.live else 'mocked'} model")
+    print(f"{'mode':>10} {'requests':>9} {'items':>6} {'items/req':>10} {'latency':>9} {'MB sent':>8}")
+    for row in rows:
+        mb_sent = f"{row['mb_sent']:.2f}" if row['mb_sent'] is not None else "-"
+        print(f"{row['mode']:>10} {row['requests']:>9} {row['items']:>6} {row['items_per_request']:>10.1f} {row['latency']:>8.2f}s {mb_sent:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -37,13 +38,14 @@ if not TAVILY_API_KEY:
     raise ValueError("TAVILY_API_KEY environment variable is required")
 
 print(f"Config loaded - NEBIUS_API_KEY: {'✓' if NEBIUS_API_KEY else '✗'}")
-print(f"Config loaded - TAVILY_API_KEY: {'✓' if TAVILY_API_KEY else '✗'}")
+print(f"Config loaded - TAVILY_API_KEY: {'✓' if TAVILY_API_KEY else '✗'}")
 
 # Appwrite configuration
 APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT", "https://cloud.appwrite.io/v1")
 APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID", "685fdd8d0002f0bfc30e")
 APPWRITE_API_KEY = os.getenv("APPWRITE_API_KEY")
 APPWRITE_DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID", "68604cf100315501c071")
+APPWRITE_MAX_CONCURRENCY = int(os.getenv("APPWRITE_MAX_CONCURRENCY", "32"))  # Threads running (blocking) Appwrite SDK calls; each saved item uses three at once
 
 # Validation
 if not APPWRITE_PROJECT_ID:
@@ -88,4 +90,85 @@ print(f"Config loaded - EBAY_APP_ID: {'✓' if EBAY_APP_ID else '✗'}")
 print(f"Config loaded - EBAY_CERT_ID: {'✓' if EBAY_CERT_ID else '✗'}")
 print(f"Config loaded - EBAY_DEV_ID: {'✓' if EBAY_DEV_ID else '✗'}")
 print(f"Config loaded - EBAY_SANDBOX_AUTH_TOKEN: {'✓' if EBAY_SANDBOX_AUTH_TOKEN else '✗'}")
-print(f"eBay Sandbox Mode: {'✓' if EBAY_SANDBOX else '✗'}")
\ No newline at end of file
+print(f"eBay Sandbox Mode: {'✓' if EBAY_SANDBOX else '✗'}")
+
+
+# Video upload configuration
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # Bytes copied per read while spooling
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "havenly_uploads"))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 60 * 60)))  # Seconds an unfinished resumable upload is kept
+
+# Video processing configuration
+FRAME_SAMPLE_COUNT = int(os.getenv("FRAME_SAMPLE_COUNT", "5"))
+FRAME_SAMPLING_MODE = os.getenv("FRAME_SAMPLING_MODE", "seek")  # seek | scene (slower: decodes most of the clip to find distinct frames) | sequential
+FRAME_SCENE_CANDIDATES = int(os.getenv("FRAME_SCENE_CANDIDATES", "40"))  # Frames scanned by scene selection; its cost grows with this
+FRAME_QUALITY_WINDOW_SECONDS = float(os.getenv("FRAME_QUALITY_WINDOW_SECONDS", "0.5"))  # Window searched for a sharper frame, 0 disables
+FRAME_QUALITY_CANDIDATES = int(os.getenv("FRAME_QUALITY_CANDIDATES", "5"))  # Frames scored inside that window
+FRAME_MAX_EDGE = int(os.getenv("FRAME_MAX_EDGE", "1280"))  # Long edge of stored/sent frames in pixels, 0 keeps full size
+FRAME_IMAGE_FORMAT = os.getenv("FRAME_IMAGE_FORMAT", "jpeg")  # jpeg | webp
+FRAME_IMAGE_QUALITY = int(os.getenv("FRAME_IMAGE_QUALITY", "80"))  # JPEG/WebP quality 0-100
+FRAME_KEEP_ORIGINAL = os.getenv("FRAME_KEEP_ORIGINAL", "false").lower() == "true"  # Keep a full-res copy for listing photos
+FRAME_DEDUP_MAX_DISTANCE = int(os.getenv("FRAME_DEDUP_MAX_DISTANCE", "6"))  # Hamming distance (of 64 bits) treated as duplicate
+ITEM_CROP_MAX_EDGE = int(os.getenv("ITEM_CROP_MAX_EDGE", "640"))  # Long edge of per-item crops used for listings, 0 keeps full size
+ITEM_CROP_PADDING = float(os.getenv("ITEM_CROP_PADDING", "0.1"))  # Margin added around each bounding box, as a fraction of its size
+
+# Vision inference configuration
+VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "5"))  # In-flight Qwen2-VL requests
+VISION_FRAME_TIMEOUT = float(os.getenv("VISION_FRAME_TIMEOUT", "60"))  # Seconds per request before giving up
+VISION_BATCH_MODE = os.getenv("VISION_BATCH_MODE", "per_frame")  # per_frame | mosaic
+VISION_MOSAIC_TILES = int(os.getenv("VISION_MOSAIC_TILES", "4"))  # Frames tiled into one mosaic request
+VISION_MOSAIC_TILE_WIDTH = int(os.getenv("VISION_MOSAIC_TILE_WIDTH", "640"))  # Width of each downscaled tile
+
+# Frame decode pool configuration
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "2"))  # Threads running OpenCV decode/encode off the event loop
+DECODE_MAX_PENDING_JOBS = int(os.getenv("DECODE_MAX_PENDING_JOBS", "4"))  # Videos decoding or waiting before uploads get 503
+DECODE_RETRY_AFTER_SECONDS = int(os.getenv("DECODE_RETRY_AFTER_SECONDS", "30"))  # Retry-After sent with 503
+
+# Extraction job scheduler configuration
+EXTRACTION_MAX_CONCURRENT_JOBS = int(os.getenv("EXTRACTION_MAX_CONCURRENT_JOBS", "2"))  # Pipelines running at once per worker; further jobs queue (up to DECODE_MAX_PENDING_JOBS in total)
+EXTRACTION_JOB_TIMEOUT_SECONDS = int(os.getenv("EXTRACTION_JOB_TIMEOUT_SECONDS", "900"))  # A running job is cancelled and marked failed after this long
+
+# Frame store configuration
+FRAME_STORE_MEMORY_BYTES = int(os.getenv("FRAME_STORE_MEMORY_BYTES", str(64 * 1024 * 1024)))  # Encoded image bytes kept in memory before spilling
+FRAME_STORE_DIR = os.getenv("FRAME_STORE_DIR", os.path.join(tempfile.gettempdir(), "havenly_frames"))  # Where least-recently-used images spill to
+FRAME_STORE_TTL_SECONDS = int(os.getenv("FRAME_STORE_TTL_SECONDS", str(48 * 60 * 60)))  # Images unused this long are deleted
+
+# Extraction result cache configuration
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "200"))  # Videos whose detections are kept for re-uploads
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # Serialized size of cached results (images live in the frame store)
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(FRAME_STORE_TTL_SECONDS)))  # Not longer than FRAME_STORE_TTL_SECONDS, or cached images may be gone
+
+# Extraction job store configuration
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 60 * 60)))  # Finished jobs are dropped this long after their last update
+JOB_STORE_MAX_JOBS = int(os.getenv("JOB_STORE_MAX_JOBS", "500"))  # Finished jobs kept before the least recently used are dropped
+JOB_STORE_MAX_BYTES = int(os.getenv("JOB_STORE_MAX_BYTES", str(32 * 1024 * 1024)))  # Serialized size of jobs the memory backend keeps
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "30"))  # A worker that stops renewing its job lease this long loses the job to another worker
+
+# Extraction event stream configuration
+JOB_EVENT_LOG_SIZE = int(os.getenv("JOB_EVENT_LOG_SIZE", "1000"))  # Events kept per job for Last-Event-ID replay
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))  # Idle streams get a comment line this often so proxies keep them open
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "1"))  # How often a stream checks for events published by other workers
+
+# Shared state configuration (jobs, negotiations, conversations)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")  # memory (single worker) | sqlite (any number of workers on one node)
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(tempfile.gettempdir(), "havenly_state.sqlite3"))  # SQLite file for the sqlite backend
+FRAME_STORE_WRITE_THROUGH = os.getenv("FRAME_STORE_WRITE_THROUGH", "false" if STATE_BACKEND == "memory" else "true").lower() == "true"  # Write images to FRAME_STORE_DIR at once so every worker can serve them
+
+# Product search configuration
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "8"))  # Tavily requests in flight across all product searches
+TAVILY_QUERY_TIMEOUT = float(os.getenv("TAVILY_QUERY_TIMEOUT", "10"))  # Seconds per Tavily query before it is abandoned
+
+# Product search cache configuration
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 60 * 60)))  # Tavily results younger than this are served without a request
+SEARCH_CACHE_STALE_SECONDS = int(os.getenv("SEARCH_CACHE_STALE_SECONDS", str(24 * 60 * 60)))  # After the TTL, served this much longer while a refresh runs in the background
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))  # Queries kept in memory before the least recently used are dropped
+SEARCH_CACHE_PERSIST = os.getenv("SEARCH_CACHE_PERSIST", "false").lower() == "true"  # Also keep results in SQLite so they survive restarts
+SEARCH_CACHE_DB_PATH = os.getenv("SEARCH_CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "havenly_search_cache.sqlite3"))  # SQLite file when SEARCH_CACHE_PERSIST is on
+
+# Local product index configuration
+PRODUCT_INDEX_ENABLED = os.getenv("PRODUCT_INDEX_ENABLED", "true").lower() == "true"  # Index every Tavily product and answer lookups from it when it can
+PRODUCT_INDEX_DB_PATH = os.getenv("PRODUCT_INDEX_DB_PATH", os.path.join(tempfile.gettempdir(), "havenly_product_index.sqlite3"))  # SQLite (FTS5) file holding the index
+PRODUCT_INDEX_MIN_HITS = int(os.getenv("PRODUCT_INDEX_MIN_HITS", "3"))  # Fresh matches needed to answer a lookup without Tavily
+PRODUCT_INDEX_MAX_AGE_SECONDS = int(os.getenv("PRODUCT_INDEX_MAX_AGE_SECONDS", str(7 * 24 * 60 * 60)))  # Products indexed longer ago only answer when Tavily returns nothing
+PRODUCT_INDEX_MAX_PRODUCTS = int(os.getenv("PRODUCT_INDEX_MAX_PRODUCTS", "100000"))  # Oldest products are dropped beyond this
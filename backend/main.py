@@ -2,11 +2,22 @@ from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from routes.buy_mode import router as buy_router
-from routes.sell_mode import router as sell_router
+from routes.sell_mode import router as sell_router, maintain_extraction_jobs, job_scheduler
 import config  # This will load the environment variables
 import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Havenly API", description="AI-powered home concierge API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Renews sell-mode job leases and resumes jobs left processing by an exited worker or a previous run
+    job_maintenance = asyncio.create_task(maintain_extraction_jobs())
+    yield
+    job_maintenance.cancel()
+    # Running extractions stop without cleanup so the next start can resume them
+    await job_scheduler.shutdown()
+
+app = FastAPI(title="Havenly API", description="AI-powered home concierge API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -15,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # Lets the frontend send If-None-Match when polling job status
 )
 
 # Include routers
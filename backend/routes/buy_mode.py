@@ -113,6 +113,21 @@ async def search_product(product_name: str, category: str = "", user_id: str = "
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching products: {str(e)}")
 
+@router.get("/search-metrics")
+async def get_search_metrics():
+    """Product search cache hit rate, and the upstream requests saved by caching and coalescing"""
+    
+    return JSONResponse(content={
+        "success": True,
+        "cache": product_search.cache.metrics(),
+        "index": product_search.index.metrics() if product_search.index else None,
+        "coalescing": {
+            "tavily": product_search.flights.stats(),
+            "room_analysis": room_analyzer.flights.stats(),
+            "chat": chat_service.flights.stats()
+        }
+    })
+
 @router.get("/suggestions/{room_type}")
 async def get_room_suggestions(room_type: str, user_id: str = "default_user"):
     """Get personalized suggestions for a room type"""
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from services.video_processor import VideoProcessor
+from services.extraction_pipeline import ExtractionPipeline
 from services.listing_generator import ListingGenerator
 from services.marketplace_automation import MarketplaceAutomation
 from services.negotiation_ai import NegotiationAI
 from services.usethis_automation import UseThisAutomation
 from services.appwrite_service import AppwriteService
+from services.upload_spool import spool_upload, remove_spool_file, ResumableUploads, OffsetMismatch
+from services.decode_pool import DecodePoolSaturated
+from services.job_store import create_job_store, VERSIONED_FIELDS
+from services.job_events import JobEventLog, FINAL_STATUSES, format_sse
+from services.job_scheduler import JobScheduler
+from services.frame_store import EXTENSIONS, image_refs
+from services.result_cache import ExtractionResultCache
+import config
 import asyncio
+import functools
+import os
+import time
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 router = APIRouter(prefix="/api/sell", tags=["sell_mode"])
 
@@ -19,73 +31,448 @@ marketplace_automation = MarketplaceAutomation()
 negotiation_ai = NegotiationAI()
 usethis_automation = UseThisAutomation()
 appwrite_service = AppwriteService()
+resumable_uploads = ResumableUploads()
 
-# Store for tracking extraction jobs
-extraction_jobs: Dict[str, Dict] = {}
+# Store for tracking extraction jobs (memory or SQLite, see STATE_BACKEND)
+extraction_jobs = create_job_store()
+
+# Progress events of extraction jobs, streamed to subscribers by /jobs/{job_id}/events
+job_events = JobEventLog()
+
+# Detections of earlier uploads, so re-uploading the same video skips the pipeline
+result_cache = ExtractionResultCache(video_processor.frame_store)
+
+# Runs this worker's extraction jobs a few at a time; the rest wait with a queue position
+job_scheduler = JobScheduler(on_queue_change=lambda job_ids: update_queue_positions(job_ids))
 
 @router.post("/upload-video")
-async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Upload video and start object extraction process"""
+async def upload_video(file: UploadFile = File(...), force: bool = False):
+    """Upload video and start object extraction process
+    
+    A video uploaded before (same bytes) is answered from the result cache with an
+    already completed job; pass force=true to extract it again.
+    """
     
     # Validate file type
     if not file.content_type.startswith('video/'):
         raise HTTPException(status_code=400, detail="File must be a video")
     
-    # Check file size (100MB limit)
-    if file.size > 100 * 1024 * 1024:
+    # Check file size (100MB limit); the size is enforced again while spooling in case it is not reported
+    if file.size and file.size > config.MAX_VIDEO_UPLOAD_BYTES:
         raise HTTPException(status_code=400, detail="File size must be less than 100MB")
     
+    # Turn the upload away before spooling it if decoding is already backed up
+    reserve_decode_slot()
+    video_path = None
+    handed_off = False
+    
     try:
         print(f"Processing video: {file.filename}, size: {file.size}, type: {file.content_type}")
         
-        # Generate job ID
-        job_id = str(uuid.uuid4())
+        # Stream the upload to disk in chunks instead of reading it into memory, hashing it on the way
+        video_path, content_sha256 = await spool_upload(file)
         
-        # Initialize job status
-        extraction_jobs[job_id] = {
-            "status": "processing",
-            "progress": 0,
-            "filename": file.filename,
-            "items": [],
-            "error": None
-        }
-        
-        # Read video data
-        video_data = await file.read()
-        
-        # Start background processing
-        background_tasks.add_task(process_video_extraction, job_id, video_data, file.filename)
+        job_id, cached = start_or_reuse_extraction(video_path, file.filename, content_sha256, force)
+        handed_off = True
         
         return JSONResponse(content={
             "success": True,
             "job_id": job_id,
+            "cached": cached,
             "message": "Video upload started. Use the job ID to check extraction status."
         })
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error in upload_video: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+    finally:
+        # Also reached on a client disconnect (CancelledError); until the job owns them, the slot and file are ours
+        if not handed_off:
+            release_upload(video_path)
 
-@router.get("/extraction-status/{job_id}")
-async def get_extraction_status(job_id: str):
-    """Check the status of video extraction job"""
+@router.post("/uploads")
+async def init_resumable_upload(request_data: dict):
+    """Start a resumable chunked video upload"""
     
-    if job_id not in extraction_jobs:
-        raise HTTPException(status_code=404, detail="Job not found")
+    filename = request_data.get("filename") or "video.mp4"
+    content_type = request_data.get("content_type") or ""
+    size = request_data.get("size")
     
-    job = extraction_jobs[job_id]
+    if not content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    
+    if not isinstance(size, int):
+        raise HTTPException(status_code=400, detail="size (in bytes) is required")
+    
+    try:
+        session = resumable_uploads.create(filename, size, content_type, request_data.get("sha256"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return JSONResponse(content={
+        "success": True,
+        "upload_id": session["upload_id"],
+        "offset": session["offset"],
+        "size": session["size"],
+        "chunk_size": config.UPLOAD_CHUNK_SIZE,
+        "message": "Upload started. PUT chunks to /api/sell/uploads/{upload_id}?offset=N, then finalize."
+    })
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: str):
+    """Get the offset to resume a chunked upload from"""
+    
+    try:
+        session = resumable_uploads.status(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return JSONResponse(content={
+        "success": True,
+        "upload_id": upload_id,
+        "offset": session["offset"],
+        "size": session["size"],
+        "complete": session["offset"] == session["size"]
+    })
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append a chunk of raw bytes starting at `offset` to a chunked upload"""
+    
+    try:
+        session = await resumable_uploads.append(upload_id, offset, request.stream())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except OffsetMismatch as e:
+        return JSONResponse(status_code=409, content={
+            "success": False,
+            "offset": e.expected_offset,
+            "detail": str(e)
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return JSONResponse(content={
+        "success": True,
+        "upload_id": upload_id,
+        "offset": session["offset"],
+        "size": session["size"],
+        "complete": session["offset"] == session["size"]
+    })
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_resumable_upload(upload_id: str, request_data: dict = None):
+    """Verify a completed chunked upload and start object extraction"""
+    
+    request_data = request_data or {}
+    
+    # Checked before finalizing so a 503 leaves the upload intact for a later retry
+    reserve_decode_slot()
+    video_path = None
+    handed_off = False
+    
+    try:
+        video_path, session = await resumable_uploads.finalize(upload_id, request_data.get("sha256"))
+        job_id, cached = start_or_reuse_extraction(video_path, session["filename"], session["sha256"], bool(request_data.get("force")))
+        handed_off = True
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if not handed_off:
+            release_upload(video_path)
     
     return JSONResponse(content={
         "success": True,
         "job_id": job_id,
-        "status": job["status"],
-        "progress": job["progress"],
-        "filename": job["filename"],
-        "frames": job.get("frames", []),  # Return frames for manual review
-        "items": job["items"],
-        "error": job.get("error")
+        "cached": cached,
+        "message": "Video upload complete. Use the job ID to check extraction status."
     })
 
+@router.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str):
+    """Abandon a chunked upload and delete its partial data"""
+    
+    try:
+        resumable_uploads.abort(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return JSONResponse(content={
+        "success": True,
+        "message": "Upload aborted"
+    })
+
+def reserve_decode_slot():
+    """Claim a decode pool slot for a new video, or reject the request with 503"""
+    
+    try:
+        video_processor.decode_pool.reserve()
+    except DecodePoolSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(config.DECODE_RETRY_AFTER_SECONDS)}
+        )
+
+def release_upload(video_path: str = None):
+    """Give back the decode slot and spooled file of an upload that never reached a job"""
+    
+    if video_path:
+        remove_spool_file(video_path)
+    video_processor.decode_pool.release()
+
+def start_or_reuse_extraction(video_path: str, filename: str, content_sha256: str, force: bool = False) -> Tuple[str, bool]:
+    """Answer a spooled upload from the result cache or queue its extraction; returns (job_id, cached)
+    
+    The caller holds a decode slot and owns the spooled file until this returns; a
+    cache hit gives both back, a queued job takes them over.
+    """
+    
+    if force:
+        result_cache.record_forced()
+    else:
+        cached = result_cache.get(content_sha256)
+        if cached is not None:
+            job_id = str(uuid.uuid4())
+            extraction_jobs.create(job_id, {
+                "status": "completed",
+                "progress": 100,
+                "filename": filename,
+                "frames": cached["frames"],
+                "items": cached["items"],
+                "dedup_ratio": cached["dedup_ratio"],
+                "cached": True,
+                "error": None
+            })
+            print(f"Reused cached extraction for {filename}: {len(cached['items'])} items, "
+                  f"{cached.get('vision_requests') or 0} vision requests saved")
+            release_upload(video_path)
+            return job_id, True
+    
+    return start_extraction_job(video_path, filename, content_sha256), False
+
+def start_extraction_job(video_path: str, filename: str, content_sha256: str = None) -> str:
+    """Register a job for a spooled video and queue its extraction; the caller holds a decode slot"""
+    
+    # Generate job ID
+    job_id = str(uuid.uuid4())
+    
+    # Initialize job status; video_path lets a restarted server resume the job
+    extraction_jobs.create(job_id, {
+        "status": "queued",
+        "progress": 0,
+        "filename": filename,
+        "video_path": video_path,
+        "content_sha256": content_sha256,
+        "items": [],
+        "error": None
+    })
+    
+    # The job owns (and eventually deletes) the spooled file and the decode slot from here on
+    job_scheduler.submit(job_id, functools.partial(process_video_extraction, job_id, video_path, filename))
+    
+    return job_id
+
+def update_queue_positions(queued_job_ids: List[str]):
+    """Record each queued job's place in line so status polls on any worker can show it"""
+    
+    for position, job_id in enumerate(queued_job_ids, start=1):
+        job = extraction_jobs.get(job_id)
+        if job is not None and job.get("queue_position") != position:
+            job["queue_position"] = position
+            extraction_jobs.save(job_id, job)
+            job_events.publish(job_id, "queue", {"queue_position": position})
+
+@router.delete("/jobs/{job_id}")
+async def cancel_extraction_job(job_id: str):
+    """Cancel a queued or running extraction job"""
+    
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    
+    was_queued = job_scheduler.position(job_id) not in (None, 0)
+    if not job_scheduler.cancel(job_id):
+        # Another worker has it; it picks the request up within a maintenance interval
+        extraction_jobs.request_cancel(job_id)
+        return JSONResponse(status_code=202, content={"success": True, "job_id": job_id, "status": "cancelling"})
+    
+    if was_queued:
+        # Never started, so nothing else will clean up after it
+        finish_cancelled_job(job_id, job, "Cancelled before processing started")
+    
+    return JSONResponse(content={"success": True, "job_id": job_id, "status": "cancelled"})
+
+def finish_cancelled_job(job_id: str, job: Dict, error: str, status: str = "cancelled"):
+    """Mark a job that will not run again as finished and free its video and decode slot"""
+    
+    remove_spool_file(job["video_path"])
+    video_processor.decode_pool.release()
+    job.update({"status": status, "queue_position": None, "error": error})
+    extraction_jobs.save(job_id, job)
+    job_events.publish(job_id, "status", {"status": status, "progress": job["progress"], "items": job["items"], "error": error})
+
+@router.get("/extraction-status/{job_id}")
+async def get_extraction_status(job_id: str, request: Request, since: int = None):
+    """Check the status of video extraction job
+    
+    Pass the last seen `version` as `since` to get only the fields that changed after it,
+    and the last ETag as If-None-Match to get a 304 when nothing changed at all.
+    Frame images are served by /jobs/{job_id}/frames/{frame_id}.jpg.
+    """
+    
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    version = job.get("version", 0)
+    etag = f'"{job_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(content=_job_status(job_id, job, since), headers=headers)
+
+def _job_status(job_id: str, job: Dict, since: int = None) -> Dict:
+    """Status payload with every field, or only those changed after version `since`"""
+    
+    version = job.get("version", 0)
+    field_versions = job.get("field_versions", {})
+    content = {
+        "success": True,
+        "job_id": job_id,
+        "version": version
+    }
+    for field in VERSIONED_FIELDS:
+        if since is None or field_versions.get(field, version) > since:
+            content[field] = job.get(field, [] if field in ("frames", "items") else None)
+    return content
+
+@router.get("/jobs/{job_id}/events")
+async def stream_extraction_events(job_id: str, request: Request, last_event_id: int = None):
+    """Stream a job's progress as server-sent events
+    
+    A new subscriber first gets a "snapshot" event with the full status, then "frame",
+    "detection", "item", "item_saved" and "progress" events as the pipeline emits them,
+    and a final "status" event when the job completes or fails. Reconnecting clients send
+    Last-Event-ID (or ?last_event_id=) and only get the events they missed.
+    """
+    
+    if extraction_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    
+    async def event_stream():
+        last_id = last_event_id
+        last_sent = time.monotonic()
+        
+        # Tell EventSource how soon to reconnect after a dropped connection
+        yield "retry: 3000\n\n"
+        
+        while not await request.is_disconnected():
+            events, missed = job_events.since(job_id, last_id or 0)
+            job = extraction_jobs.get(job_id)
+            if job is None:
+                break
+            
+            if last_id is None or missed:
+                # New subscriber, or the events it missed are no longer kept: send the whole state
+                last_id = job_events.last_id(job_id)
+                yield format_sse(_job_status(job_id, job), event="snapshot", event_id=last_id)
+                last_sent = time.monotonic()
+                if job["status"] in FINAL_STATUSES:
+                    break
+                continue
+            
+            for event in events:
+                yield format_sse(event["data"], event=event["event"], event_id=event["id"])
+                last_id = event["id"]
+                last_sent = time.monotonic()
+            
+            if any(event["event"] == "status" and event["data"]["status"] in FINAL_STATUSES for event in events):
+                break
+            
+            if not events:
+                if time.monotonic() - last_sent >= config.SSE_HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                # Woken at once by publishes in this worker; other workers' events are found on the next poll
+                await job_events.wait(job_id, config.SSE_POLL_SECONDS)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}/frames/{frame_id}.jpg")
+async def get_job_frame(job_id: str, frame_id: str, request: Request):
+    """Serve one extracted frame of a job as a cacheable image"""
+    
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    frame = next((frame for frame in job.get("frames", []) if frame["id"] == frame_id), None)
+    if frame is None or not frame.get("frame_ref"):
+        raise HTTPException(status_code=404, detail="Frame not found")
+    
+    return _image_response(frame["frame_ref"], request)
+
+@router.get("/result-cache-metrics")
+async def get_result_cache_metrics():
+    """Hit rate of the extraction result cache and the vision requests it saved"""
+    
+    return JSONResponse(content={"success": True, "metrics": result_cache.metrics()})
+
+@router.get("/extraction-metrics")
+async def get_extraction_metrics():
+    """Load on this worker's job scheduler and decode pool, and the size of the job and frame stores"""
+    
+    decode_pool = video_processor.decode_pool
+    return JSONResponse(content={"success": True, "metrics": {
+        "scheduler": job_scheduler.stats(),
+        "decode_pool": {
+            "workers": decode_pool.workers,
+            "pending": decode_pool.pending,
+            "max_pending": decode_pool.max_pending,
+            "saturated": decode_pool.saturated
+        },
+        "jobs": extraction_jobs.stats(),
+        "frame_store": video_processor.frame_store.stats()
+    }})
+
+@router.get("/images/{frame_ref}")
+async def get_frame_image(frame_ref: str, request: Request):
+    """Serve a frame or item image referenced by its content hash"""
+    
+    return _image_response(frame_ref, request)
+
+def _image_response(frame_ref: str, request: Request) -> Response:
+    """Image bytes from the frame store, with caching headers keyed by the content hash"""
+    
+    # Content-addressed, so the bytes behind a reference never change
+    headers = {"ETag": f'"{frame_ref}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"] and frame_ref in video_processor.frame_store:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        image_bytes = video_processor.frame_store.get(frame_ref)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    return Response(content=image_bytes, media_type=video_processor.frame_store.mime_type(frame_ref), headers=headers)
+
 @router.post("/generate-listings")
 async def generate_listings(request_data: dict):
     """Generate marketplace listings for extracted items"""
@@ -94,11 +481,10 @@ async def generate_listings(request_data: dict):
     if not job_id:
         raise HTTPException(status_code=400, detail="job_id is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Extraction not completed yet")
     
@@ -108,7 +494,8 @@ async def generate_listings(request_data: dict):
         # Generate listings for each item
         listings = []
         for item in job["items"]:
-            listing = await listing_generator.create_listing(item)
+            # The listing model gets the item's (cropped) image resolved from the frame store
+            listing = await listing_generator.create_listing({**item, "frame_data": video_processor.resolve_image(item)})
             listings.append(listing)
         
         return JSONResponse(content={
@@ -144,11 +531,10 @@ async def handle_negotiation(listing_id: str, buyer_message: str, current_price:
 async def add_manual_item(job_id: str, frame_id: str, item_name: str, category: str, price: float, condition: str = "good"):
     """Add a manually identified item to a frame"""
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     # Create manual item
     manual_item = {
         'id': f"manual_item_{len(job['items'])}",
@@ -163,6 +549,7 @@ async def add_manual_item(job_id: str, frame_id: str, item_name: str, category:
     
     # Add to job items
     job['items'].append(manual_item)
+    extraction_jobs.save(job_id, job)
     
     return JSONResponse(content={
         "success": True,
@@ -174,7 +561,6 @@ async def add_manual_item(job_id: str, frame_id: str, item_name: str, category:
 async def get_category_suggestions():
     """Get category suggestions for manual item entry"""
     
-    video_processor = VideoProcessor()
     suggestions = video_processor.get_category_suggestions()
     
     return JSONResponse(content={
@@ -197,11 +583,10 @@ async def update_item(request_data: dict):
     if item_index is None:
         raise HTTPException(status_code=400, detail="item_index is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if item_index >= len(job['items']) or item_index < 0:
         raise HTTPException(status_code=400, detail="Invalid item index")
     
@@ -210,6 +595,7 @@ async def update_item(request_data: dict):
         job['items'][item_index]['name'] = name
     if estimated_price is not None:
         job['items'][item_index]['estimated_price'] = estimated_price
+    extraction_jobs.save(job_id, job)
     
     return JSONResponse(content={
         "success": True,
@@ -230,16 +616,16 @@ async def delete_item(request_data: dict):
     if item_index is None:
         raise HTTPException(status_code=400, detail="item_index is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if item_index >= len(job['items']) or item_index < 0:
         raise HTTPException(status_code=400, detail="Invalid item index")
     
     # Remove the item
     deleted_item = job['items'].pop(item_index)
+    extraction_jobs.save(job_id, job)
     
     return JSONResponse(content={
         "success": True,
@@ -272,6 +658,10 @@ async def post_to_facebook(listing_data: dict):
     """Automatically post listing to Facebook Marketplace"""
     
     try:
+        # Listings reference their photo; resolve it for the upload
+        if not listing_data.get("image_data") and listing_data.get("image_ref") in video_processor.frame_store:
+            listing_data["image_data"] = video_processor.frame_store.get_base64(listing_data["image_ref"])
+        
         success = marketplace_automation.post_to_marketplace(listing_data)
         
         if success:
@@ -372,11 +762,10 @@ async def post_to_usethis(request_data: dict):
     if not job_id:
         raise HTTPException(status_code=400, detail="job_id is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Extraction not completed yet")
     
@@ -392,7 +781,7 @@ async def post_to_usethis(request_data: dict):
                 "price": float(item['estimated_price']),
                 "category": item.get('category', 'misc'),
                 "condition": item.get('condition', 'good'),
-                "image_data": item.get('frame_data', ''),
+                "image_data": video_processor.resolve_image(item, prefer_original=True),
                 "rental_type": "daily"
             }
             
@@ -457,11 +846,10 @@ async def create_storefront(request_data: dict):
     if not email:
         raise HTTPException(status_code=400, detail="UseThis email is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Extraction not completed yet")
     
@@ -473,9 +861,11 @@ async def create_storefront(request_data: dict):
         for item in job["items"]:
             try:
                 # Upload image to Appwrite storage
+                mime_type = video_processor.resolve_mime_type(item, prefer_original=True)
                 image_url = await appwrite_service.upload_image_to_storage_only(
-                    image_data=item.get('frame_data', ''),
-                    filename=f"{item['name']}_usethis.jpg"
+                    image_data=video_processor.resolve_image(item, prefer_original=True),
+                    filename=f"{item['name']}_usethis{EXTENSIONS.get(mime_type, '.jpg')}",
+                    mime_type=mime_type
                 )
                 
                 # Use AI to generate realistic rental listing data
@@ -563,11 +953,10 @@ async def post_to_ebay(request_data: dict):
     if not job_id:
         raise HTTPException(status_code=400, detail="job_id is required")
     
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = extraction_jobs[job_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Extraction not completed yet")
     
@@ -578,7 +967,7 @@ async def post_to_ebay(request_data: dict):
         for item in job["items"]:
             try:
                 # Create eBay listing
-                result = await ebay_service.create_listing(item)
+                result = await ebay_service.create_listing({**item, "frame_data": video_processor.resolve_image(item, prefer_original=True)})
                 
                 if result["success"]:
                     posted_listings.append({
@@ -653,68 +1042,142 @@ async def get_ebay_config():
         "auth_token_configured": bool(ebay_service.sandbox_auth_token)
     })
 
-async def process_video_extraction(job_id: str, video_data: bytes, filename: str):
-    """Background task to process video and extract sellable items using AI"""
+async def process_video_extraction(job_id: str, video_path: str, filename: str):
+    """Scheduled job that processes a video and extracts sellable items using AI"""
+    
+    job = extraction_jobs[job_id]
+    job.update({"status": "processing", "queue_position": None})
+    extraction_jobs.save(job_id, job)
+    job_events.publish(job_id, "status", {"status": "processing", "progress": job["progress"], "queue_position": None})
+    
+    # Decode, detection and Appwrite saves overlap; the pipeline updates progress and items as it goes
+    user_id = "default_user"  # You can get this from session/auth
+    pipeline = ExtractionPipeline(video_processor, appwrite_service, user_id=user_id)
     
     try:
-        # Update progress
-        extraction_jobs[job_id]["progress"] = 10
+        # Saving on every update lets other workers serve status polls for this job
+        sellable_items = await pipeline.run(
+            job,
+            video_path,
+            on_update=lambda: extraction_jobs.save(job_id, job),
+            on_event=lambda event, data: job_events.publish(job_id, event, data)
+        )
         
-        # Extract frames from video
-        frames = await video_processor.extract_frames(video_data)
-        extraction_jobs[job_id]["progress"] = 30
-        extraction_jobs[job_id]["frames"] = frames
+        # Store results
+        job["items"] = sellable_items
+        job["progress"] = 100
+        job["status"] = "completed"
         
-        # Detect objects in frames using AI
-        detected_objects = await video_processor.detect_objects(frames)
-        extraction_jobs[job_id]["progress"] = 60
+        if job.get("content_sha256"):
+            result_cache.put(job["content_sha256"], job)
         
-        # Filter for sellable items
-        sellable_items = await video_processor.filter_sellable_items(detected_objects)
-        extraction_jobs[job_id]["progress"] = 80
+        failed_saves = sum(1 for item in sellable_items if item.get("save_error"))
+        print(f"Video extraction completed for job {job_id}: {len(sellable_items)} items found, "
+              f"{len(sellable_items) - failed_saves} saved to Appwrite, {failed_saves} failed")
         
-        # Save items to Appwrite database
-        user_id = "default_user"  # You can get this from session/auth
+    except asyncio.CancelledError:
+        reason = job_scheduler.cancel_reason(job_id)
+        if reason is None:
+            # The server is shutting down: keep the spooled video so the job resumes on the next start
+            video_processor.decode_pool.release()
+            raise
         
-        for item in sellable_items:
+        print(f"Video extraction for job {job_id} stopped: {reason}")
+        if reason == "timeout":
+            job["status"] = "failed"
+            job["error"] = f"Processing took longer than {config.EXTRACTION_JOB_TIMEOUT_SECONDS} seconds"
+        else:
+            job["status"] = "cancelled"
+            job["error"] = "Cancelled by the user"
+    except Exception as e:
+        print(f"Error in video extraction for job {job_id}: {str(e)}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    
+    # Drop the spooled video - nothing later needs the file - and persist the final state
+    remove_spool_file(video_path)
+    video_processor.decode_pool.release()
+    extraction_jobs.save(job_id, job)
+    job_events.publish(job_id, "status", {
+        "status": job["status"],
+        "progress": job["progress"],
+        "items": job["items"],
+        "error": job.get("error")
+    })
+    extraction_jobs.clear_cancel_request(job_id)
+    
+    # The job's images are only read on demand from now on
+    video_processor.frame_store.spill(image_refs(job.get("frames", []) + job.get("items", [])))
+    video_processor.frame_store.prune(config.FRAME_STORE_TTL_SECONDS)
+
+async def recover_extraction_jobs():
+    """Restart jobs an exited worker (or server run) left processing, or fail them if their video is gone"""
+    
+    for job_id, job in extraction_jobs.recover_interrupted():
+        video_path = job.get("video_path")
+        
+        if video_path and os.path.exists(video_path):
             try:
-                # Upload image to Appwrite
-                image_url = await appwrite_service.upload_image(
-                    image_data=item["frame_data"],
-                    user_id=user_id,
-                    image_type="item_frame",
-                    original_filename=f"{item['name']}_frame.jpg"
-                )
-                
-                # Save item to database
-                item_doc_id = await appwrite_service.save_extracted_item(
-                    item=item,
-                    user_id=user_id,
-                    image_url=image_url
-                )
-                
-                # Update item with database info
-                item["appwrite_doc_id"] = item_doc_id
-                item["image_url"] = image_url
-                
-                print(f"Saved item '{item['name']}' to Appwrite with image URL: {image_url}")
-                
-            except Exception as e:
-                print(f"Error saving item '{item['name']}' to Appwrite: {str(e)}")
-                # Continue with other items even if one fails
+                video_processor.decode_pool.reserve()
+            except DecodePoolSaturated:
+                # Busy here; leave it for the next sweep on this or another worker
+                extraction_jobs.release_claim(job_id)
+                continue
+            
+            if extraction_jobs.cancel_requested(job_id):
+                finish_cancelled_job(job_id, job, "Cancelled by the user")
+                extraction_jobs.clear_cancel_request(job_id)
                 continue
+            
+            print(f"Resuming extraction job {job_id} for {job['filename']}")
+            job.update({"status": "queued", "progress": 0, "items": [], "frames": [], "error": None})
+            extraction_jobs.save(job_id, job)
+            # Subscribers drop what they had so far; the pipeline streams the job again from the start
+            job_events.publish(job_id, "status", {"status": "queued", "progress": 0, "items": [], "frames": [], "error": None})
+            
+            # Interrupted jobs go ahead of new uploads
+            job_scheduler.submit(job_id, functools.partial(process_video_extraction, job_id, video_path, job["filename"]), priority=-1)
+            continue
         
-        # Store results
-        extraction_jobs[job_id]["items"] = sellable_items
-        extraction_jobs[job_id]["progress"] = 100
-        extraction_jobs[job_id]["status"] = "completed"
+        print(f"Extraction job {job_id} was interrupted and its video is gone; marking it failed")
+        job["status"] = "failed"
+        job["error"] = "Processing was interrupted by a server restart. Please upload the video again."
+        extraction_jobs.save(job_id, job)
+
+def cancel_requested_jobs():
+    """Cancel jobs of this worker that a DELETE on another worker asked to stop"""
+    
+    for job_id in job_scheduler.queued() + job_scheduler.running():
+        if not extraction_jobs.cancel_requested(job_id):
+            continue
         
-        print(f"Video extraction completed for job {job_id}: {len(sellable_items)} items found and saved to Appwrite")
+        job = extraction_jobs.get(job_id)
+        was_queued = job_scheduler.position(job_id) != 0
+        job_scheduler.cancel(job_id)
+        if was_queued and job is not None:
+            finish_cancelled_job(job_id, job, "Cancelled before processing started")
+            extraction_jobs.clear_cancel_request(job_id)
+
+def prune_job_events():
+    """Drop the event logs of jobs the job store no longer has (expired or evicted)"""
+    
+    for job_id in job_events.job_ids():
+        if job_id not in extraction_jobs:
+            job_events.delete(job_id)
+
+async def maintain_extraction_jobs():
+    """Keep this worker's job leases alive, apply cancellations sent to other workers and take over orphaned jobs"""
+    
+    while True:
+        try:
+            extraction_jobs.renew_leases()
+            cancel_requested_jobs()
+            prune_job_events()
+            await recover_extraction_jobs()
+        except Exception as e:
+            print(f"Error maintaining extraction jobs: {str(e)}")
         
-    except Exception as e:
-        print(f"Error in video extraction for job {job_id}: {str(e)}")
-        extraction_jobs[job_id]["status"] = "failed"
-        extraction_jobs[job_id]["error"] = str(e)
+        await asyncio.sleep(config.JOB_LEASE_SECONDS / 3)
 
 async def generate_usethis_listing_with_ai(item: Dict) -> Dict:
     """Generate UseThis rental listing data using Nebius AI"""
@@ -2,11 +2,13 @@ from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.services.storage import Storage
 from appwrite.id import ID
+from appwrite.input_file import InputFile
 import config
+import asyncio
 import base64
-import tempfile
-import os
-from typing import Dict, List
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 from datetime import datetime
 
 class AppwriteService:
@@ -23,49 +25,73 @@ class AppwriteService:
         self.saved_items_collection_id = "68604d09001d229173f2"  # Actual collection ID from Appwrite
         self.sell_items_collection_id = "sell_items"  # Sell mode extracted items
         self.bucket_id = "6860506f002eb0873e7c"  # User's storage bucket ID
+        
+        # The SDK is synchronous; its calls run here so they neither block the event loop nor pile up unbounded
+        self.executor = ThreadPoolExecutor(max_workers=config.APPWRITE_MAX_CONCURRENCY, thread_name_prefix="appwrite")
+    
+    async def _call(self, func, **kwargs):
+        """Run a blocking SDK call on the Appwrite thread pool"""
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, **kwargs))
+    
+    def new_file(self) -> Tuple[str, str]:
+        """A fresh storage file ID and the URL the file will be served from once uploaded"""
+        
+        file_id = ID.unique()
+        return file_id, self.file_url(file_id)
     
-    async def upload_image(self, image_data: str, user_id: str, image_type: str, original_filename: str = None) -> str:
-        """Upload base64 image to Appwrite storage and save metadata to database"""
+    def file_url(self, file_id: str) -> str:
+        return f"{config.APPWRITE_ENDPOINT}/storage/buckets/{self.bucket_id}/files/{file_id}/view?project={config.APPWRITE_PROJECT_ID}"
+    
+    async def _create_file(self, file_id: str, image_data: str, filename: str, mime_type: str = "image/jpeg"):
+        await self._call(
+            self.storage.create_file,
+            bucket_id=self.bucket_id,
+            file_id=file_id,
+            file=InputFile.from_bytes(base64.b64decode(image_data), filename=filename or f"{file_id}.jpg", mime_type=mime_type)
+        )
+    
+    async def upload_image(self, image_data: str, user_id: str, image_type: str, original_filename: str = None,
+                           file_id: str = None, mime_type: str = "image/jpeg") -> str:
+        """Upload base64 image to Appwrite storage and save metadata to database
+        
+        Pass a file_id from new_file() when the image URL is needed before the upload finishes.
+        """
         
         try:
-            # Convert base64 to file
-            image_bytes = base64.b64decode(image_data)
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_file.write(image_bytes)
-                temp_path = temp_file.name
-            
-            # Generate unique file ID
-            file_id = ID.unique()
+            file_id = file_id or ID.unique()
+            image_url = self.file_url(file_id)
             
-            # Upload to Appwrite storage
-            file_result = self.storage.create_file(
-                bucket_id=self.bucket_id,
-                file_id=file_id,
-                file=open(temp_path, 'rb')
+            # The URL is known up front, so the file and its metadata document are written together.
+            # The metadata document shares the file's ID, so delete_image() can find both.
+            metadata_id = file_id
+            upload, metadata = await asyncio.gather(
+                self._create_file(file_id, image_data, original_filename, mime_type),
+                self._call(
+                    self.databases.create_document,
+                    database_id=self.database_id,
+                    collection_id=self.saved_items_collection_id,
+                    document_id=metadata_id,
+                    data={
+                        "image_id": file_id,
+                        "user_id": user_id,
+                        "image_url": image_url,
+                        "image_type": image_type,
+                        "original_filename": original_filename or "unknown.jpg",
+                        "created_at": datetime.now().isoformat()
+                    }
+                ),
+                return_exceptions=True
             )
             
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Get file URL
-            image_url = f"{config.APPWRITE_ENDPOINT}/storage/buckets/{self.bucket_id}/files/{file_id}/view?project={config.APPWRITE_PROJECT_ID}"
-            
-            # Save metadata to database
-            image_doc = self.databases.create_document(
-                database_id=self.database_id,
-                collection_id=self.saved_items_collection_id,
-                document_id=ID.unique(),
-                data={
-                    "image_id": file_id,
-                    "user_id": user_id,
-                    "image_url": image_url,
-                    "image_type": image_type,
-                    "original_filename": original_filename or "unknown.jpg",
-                    "created_at": datetime.now().isoformat()
-                }
-            )
+            # Don't leave a file without its metadata, or metadata for a file that was never stored
+            if isinstance(upload, Exception) or isinstance(metadata, Exception):
+                if not isinstance(upload, Exception):
+                    await self._delete_file_quietly(file_id)
+                if not isinstance(metadata, Exception):
+                    await self._delete_document_quietly(self.saved_items_collection_id, metadata_id)
+                raise upload if isinstance(upload, Exception) else metadata
             
             return image_url
             
@@ -73,33 +99,13 @@ class AppwriteService:
             print(f"Error uploading image to Appwrite: {str(e)}")
             raise Exception(f"Failed to upload image: {str(e)}")
     
-    async def upload_image_to_storage_only(self, image_data: str, filename: str = None) -> str:
+    async def upload_image_to_storage_only(self, image_data: str, filename: str = None, mime_type: str = "image/jpeg") -> str:
         """Upload base64 image to Appwrite storage only (no database)"""
         
         try:
-            # Convert base64 to file
-            image_bytes = base64.b64decode(image_data)
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_file.write(image_bytes)
-                temp_path = temp_file.name
-            
-            # Generate unique file ID
-            file_id = ID.unique()
-            
             # Upload to Appwrite storage
-            file_result = self.storage.create_file(
-                bucket_id=self.bucket_id,
-                file_id=file_id,
-                file=open(temp_path, 'rb')
-            )
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Get file URL
-            image_url = f"{config.APPWRITE_ENDPOINT}/storage/buckets/{self.bucket_id}/files/{file_id}/view?project={config.APPWRITE_PROJECT_ID}"
+            file_id, image_url = self.new_file()
+            await self._create_file(file_id, image_data, filename, mime_type)
             
             print(f"Uploaded image to Appwrite storage: {image_url}")
             return image_url
@@ -112,7 +118,8 @@ class AppwriteService:
         """Save extracted item to Appwrite database (sell mode)"""
         
         try:
-            item_doc = self.databases.create_document(
+            item_doc = await self._call(
+                self.databases.create_document,
                 database_id=self.database_id,
                 collection_id=self.sell_items_collection_id,  # Use separate collection for sell mode
                 document_id=ID.unique(),
@@ -134,11 +141,42 @@ class AppwriteService:
             print(f"Error saving item to Appwrite: {str(e)}")
             raise Exception(f"Failed to save item: {str(e)}")
     
+    async def delete_extracted_item(self, item_doc_id: str):
+        """Remove a sell mode item document, e.g. when its image failed to upload"""
+        
+        await self._delete_document_quietly(self.sell_items_collection_id, item_doc_id)
+    
+    async def delete_image(self, file_id: str):
+        """Remove an image stored with upload_image and its metadata, e.g. when its item failed to save"""
+        
+        await asyncio.gather(
+            self._delete_file_quietly(file_id),
+            self._delete_document_quietly(self.saved_items_collection_id, file_id)
+        )
+    
+    async def _delete_file_quietly(self, file_id: str):
+        try:
+            await self._call(self.storage.delete_file, bucket_id=self.bucket_id, file_id=file_id)
+        except Exception as e:
+            print(f"Error deleting Appwrite file {file_id}: {str(e)}")
+    
+    async def _delete_document_quietly(self, collection_id: str, document_id: str):
+        try:
+            await self._call(
+                self.databases.delete_document,
+                database_id=self.database_id,
+                collection_id=collection_id,
+                document_id=document_id
+            )
+        except Exception as e:
+            print(f"Error deleting Appwrite document {document_id}: {str(e)}")
+    
     async def get_user_items(self, user_id: str) -> List[Dict]:
         """Get all sell mode items for a user"""
         
         try:
-            result = self.databases.list_documents(
+            result = await self._call(
+                self.databases.list_documents,
                 database_id=self.database_id,
                 collection_id=self.sell_items_collection_id,  # Use separate collection for sell mode
                 queries=[f'equal("user_id", "{user_id}")']
@@ -154,7 +192,8 @@ class AppwriteService:
         """Update sell mode item status (draft/listed/sold)"""
         
         try:
-            self.databases.update_document(
+            await self._call(
+                self.databases.update_document,
                 database_id=self.database_id,
                 collection_id=self.sell_items_collection_id,  # Use separate collection for sell mode
                 document_id=item_id,
@@ -176,7 +215,8 @@ class AppwriteService:
             if len(description) > 150:
                 description = description[:147] + "..."
             
-            saved_item = self.databases.create_document(
+            saved_item = await self._call(
+                self.databases.create_document,
                 database_id=self.database_id,
                 collection_id=self.saved_items_collection_id,  # havenly collection for buy mode only
                 document_id=ID.unique(),
@@ -208,7 +248,8 @@ class AppwriteService:
         try:
             from appwrite.query import Query
             
-            result = self.databases.list_documents(
+            result = await self._call(
+                self.databases.list_documents,
                 database_id=self.database_id,
                 collection_id=self.saved_items_collection_id,  # havenly collection for buy mode only
                 queries=[Query.equal("user_id", user_id)]
@@ -3,6 +3,7 @@ from typing import Dict, List, Any
 import config
 from services.mem0_service import Mem0Service
 from services.product_search import ProductSearchService
+from services.single_flight import SingleFlight
 from openai import OpenAI
 
 class ChatService:
@@ -29,6 +30,9 @@ class ChatService:
         
         # Initialize product search
         self.product_search = ProductSearchService()
+        
+        # Identical prompts (same message and context) in flight at once share one model call
+        self.flights = SingleFlight()
     
     async def handle_chat_message(self, user_id: str, message: str, conversation_history: List[Dict] = None) -> Dict[str, Any]:
         """Handle chat message with intelligent AI responses using Nebius"""
@@ -93,6 +97,9 @@ class ChatService:
     async def _generate_ai_response(self, message: str, context: str) -> str:
         """Generate AI response using Nebius"""
         
+        return await self.flights.do(SingleFlight.key(message, context), lambda: self._request_ai_response(message, context))
+    
+    async def _request_ai_response(self, message: str, context: str) -> str:
         try:
             system_prompt = f"""You are Havenly, an AI home concierge assistant. You help users make their spaces more cozy and beautiful.
 
@@ -109,7 +116,9 @@ Guidelines:
 
 Respond to the user's message in a helpful, personalized way."""
 
-            response = self.ai_client.chat.completions.create(
+            # The client is synchronous; keep the event loop free while the model runs
+            response = await asyncio.to_thread(
+                self.ai_client.chat.completions.create,
                 model="deepseek-ai/DeepSeek-V3",
                 max_tokens=512,
                 temperature=0.7,
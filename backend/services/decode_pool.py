@@ -0,0 +1,51 @@
+import config
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class DecodePoolSaturated(Exception):
+    """Raised when the decode pool already has as many videos as it will accept"""
+    pass
+
+class DecodePool:
+    """Bounded thread pool for OpenCV decode/encode work
+    
+    OpenCV releases the GIL while decoding and encoding, so worker threads keep the
+    event loop free without the pickling cost of a process pool. Admission is counted
+    per extraction job: reserve() a slot before accepting an upload and release() it
+    when the job is done with the video - after the whole pipeline (detection and
+    saving included) has finished, or when the job fails, is cancelled or is answered
+    from the result cache. Queued jobs hold their slot too, so max_pending (the point
+    where uploads get 503) bounds queued plus running jobs, not pending decode work.
+    """
+    
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or config.DECODE_WORKERS
+        self.max_pending = max_pending or config.DECODE_MAX_PENDING_JOBS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="frame-decode")
+        self.pending = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+    
+    def reserve(self):
+        """Claim a slot for one video, or raise DecodePoolSaturated"""
+        
+        with self._lock:
+            if self.saturated:
+                raise DecodePoolSaturated(f"Video processing is at capacity ({self.pending} videos queued), try again later")
+            self.pending += 1
+    
+    def release(self):
+        """Give back a slot claimed with reserve()"""
+        
+        with self._lock:
+            self.pending = max(0, self.pending - 1)
+    
+    async def run(self, func, *args):
+        """Run a blocking call on the pool and await its result"""
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
@@ -143,11 +143,12 @@ class EbayService:
             # Generate SKU
             sku = f"HAVENLY_{item_data.get('id', 'unknown')}_{int(datetime.now().timestamp())}"
             
-            # Upload image first
+            # Upload image first (full-resolution frame when one was kept)
             image_url = None
-            if item_data.get('frame_data'):
+            image_data = item_data.get('original_frame_data') or item_data.get('frame_data')
+            if image_data:
                 image_url = await self.upload_image_to_eps(
-                    item_data['frame_data'], 
+                    image_data, 
                     f"{item_data.get('name', 'item').replace(' ', '_')}.jpg"
                 )
             
@@ -0,0 +1,226 @@
+import config
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+from services.frame_store import EXTENSIONS
+from services.video_processor import VideoProcessor, SellableItemCollector
+
+# Share of the progress bar given to each stage
+DECODE_WEIGHT = 30
+DETECT_WEIGHT = 50
+PERSIST_WEIGHT = 19
+
+class ExtractionPipeline:
+    """Streams one video through decode -> frame dedup -> detection -> item dedup -> Appwrite
+    
+    Stages are connected by asyncio queues, so the first vision request starts as soon as the
+    first frame is decoded and each item is saved as soon as it is found. Progress on the job
+    dict reflects real per-frame and per-item completion.
+    """
+    
+    def __init__(self, video_processor: VideoProcessor, appwrite_service, user_id: str = "default_user"):
+        self.video_processor = video_processor
+        self.appwrite_service = appwrite_service
+        self.user_id = user_id
+    
+    async def run(self, job: Dict, video_path: str, on_update: Callable[[], None] = None,
+                  on_event: Callable[[str, Dict], None] = None) -> List[Dict]:
+        """Process the video, updating `job` in place; returns the sellable items
+        
+        on_update is called after every progress change, e.g. to persist the job.
+        on_event(event, data) is called with "frame", "detection", "item", "item_saved"
+        and "progress" events as they happen, e.g. to stream them to clients.
+        """
+        
+        job["frames"] = []
+        job["items"] = []
+        
+        started_at = time.monotonic()
+        counts = {"decoded": 0, "unique": 0, "detected": 0, "found": 0, "saved": 0, "vision_requests": 0, "decoding_done": False}
+        
+        detection_queue: asyncio.Queue = asyncio.Queue()
+        item_queue: asyncio.Queue = asyncio.Queue()
+        collector = SellableItemCollector(self.video_processor.frame_store)
+        
+        def emit(event: str, data: Dict):
+            if on_event:
+                on_event(event, data)
+        
+        def update_progress():
+            expected_frames = counts["decoded"] if counts["decoding_done"] else max(counts["decoded"], config.FRAME_SAMPLE_COUNT)
+            decode_share = counts["decoded"] / expected_frames if expected_frames else 1
+            detect_share = counts["detected"] / counts["unique"] if counts["unique"] else 0
+            persist_share = counts["saved"] / counts["found"] if counts["found"] else 0
+            
+            progress = int(DECODE_WEIGHT * decode_share + DETECT_WEIGHT * detect_share * decode_share + PERSIST_WEIGHT * persist_share * detect_share)
+            # Never move backwards when a later frame reveals more work
+            progress = max(job.get("progress", 0), min(99, progress))
+            if progress != job.get("progress"):
+                emit("progress", {"progress": progress})
+            job["progress"] = progress
+            if on_update:
+                on_update()
+        
+        async def decode():
+            kept_frames = []
+            frames = self.video_processor.iter_frames(video_path)
+            decoding = None
+            try:
+                while True:
+                    # Decoding runs on the bounded decode pool, so detection (and other requests) run meanwhile.
+                    # Shielded so a cancelled job still knows when the thread has left the generator.
+                    decoding = asyncio.ensure_future(self.video_processor.decode_pool.run(next, frames, None))
+                    frame_info = await asyncio.shield(decoding)
+                    if frame_info is None:
+                        break
+                    
+                    counts["decoded"] += 1
+                    
+                    duplicate_of = self.video_processor.find_duplicate_frame(frame_info, kept_frames)
+                    if duplicate_of:
+                        # Keep the frame for manual review but don't send it to the vision model
+                        frame_info["duplicate_of"] = duplicate_of["id"]
+                    else:
+                        kept_frames.append({"id": frame_info["id"], "phash": frame_info.get("phash")})
+                        counts["unique"] += 1
+                        await detection_queue.put(frame_info)
+                    
+                    # The job keeps only a reference; the in-flight copy with image data is dropped after detection
+                    job["frames"].append(self.video_processor.store_frame(frame_info))
+                    emit("frame", job["frames"][-1])
+                    
+                    update_progress()
+            finally:
+                if decoding is not None and not decoding.done():
+                    # Closing a generator another thread is running raises ValueError; let the frame finish first
+                    await asyncio.wait([decoding])
+                frames.close()
+                counts["decoding_done"] = True
+                job["dedup_ratio"] = round(1 - len(kept_frames) / len(job["frames"]), 3) if job["frames"] else 0.0
+                await detection_queue.put(None)
+        
+        async def detect_batch(frames: List[Dict]):
+            detected_objects = await self.video_processor.detect_objects(frames)
+            # A batch is one mosaic request, or one request per frame
+            counts["vision_requests"] += 1 if config.VISION_BATCH_MODE == "mosaic" else len(frames)
+            
+            emit("detection", {"frame_ids": [frame["id"] for frame in frames], "objects": len(detected_objects)})
+            
+            for obj in detected_objects:
+                item = collector.add(obj)
+                if item:
+                    counts["found"] += 1
+                    job["items"].append(item)
+                    if "first_item_seconds" not in job:
+                        job["first_item_seconds"] = round(time.monotonic() - started_at, 3)
+                    emit("item", item)
+                    await item_queue.put(item)
+            
+            counts["detected"] += len(frames)
+            update_progress()
+        
+        async def detect():
+            # Mosaic mode waits for a full grid of frames (or the end of the video) per request
+            batch_size = max(1, config.VISION_MOSAIC_TILES) if config.VISION_BATCH_MODE == "mosaic" else 1
+            batch = []
+            tasks = []
+            
+            try:
+                while True:
+                    frame_info = await detection_queue.get()
+                    if frame_info is not None:
+                        batch.append(frame_info)
+                    
+                    if batch and (len(batch) >= batch_size or frame_info is None):
+                        tasks.append(asyncio.create_task(detect_batch(batch)))
+                        batch = []
+                    
+                    if frame_info is None:
+                        break
+                
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await item_queue.put(None)
+        
+        async def save(item: Dict):
+            item_doc_id = await self._save_item(item)
+            emit("item_saved", {
+                "id": item["id"],
+                "saved": item_doc_id is not None,
+                "appwrite_doc_id": item.get("appwrite_doc_id"),
+                "image_url": item.get("image_url"),
+                "error": item.get("save_error")
+            })
+            counts["saved"] += 1
+            update_progress()
+        
+        async def persist():
+            # Items are saved concurrently; AppwriteService bounds how many SDK calls run at once
+            saves = []
+            try:
+                while True:
+                    item = await item_queue.get()
+                    if item is None:
+                        break
+                    saves.append(asyncio.create_task(save(item)))
+                
+                await asyncio.gather(*saves)
+            finally:
+                for task in saves:
+                    task.cancel()
+        
+        await asyncio.gather(decode(), detect(), persist())
+        job["vision_requests"] = counts["vision_requests"]
+        
+        print(f"Pipeline finished in {time.monotonic() - started_at:.2f}s: {counts['decoded']} frames, "
+              f"{counts['unique']} unique, {counts['found']} items")
+        return job["items"]
+    
+    async def _save_item(self, item: Dict) -> Optional[str]:
+        """Upload an item's image and create its Appwrite document
+        
+        Returns the document ID, or None with the reason in item["save_error"].
+        """
+        
+        # The image URL is known before the upload, so the image and the item document are written together
+        file_id, image_url = self.appwrite_service.new_file()
+        mime_type = self.video_processor.resolve_mime_type(item, prefer_original=True)
+        upload, item_doc_id = await asyncio.gather(
+            self.appwrite_service.upload_image(
+                image_data=self.video_processor.resolve_image(item, prefer_original=True),
+                user_id=self.user_id,
+                image_type="item_frame",
+                original_filename=f"{item['name']}_frame{EXTENSIONS.get(mime_type, '.jpg')}",
+                file_id=file_id,
+                mime_type=mime_type
+            ),
+            self.appwrite_service.save_extracted_item(
+                item=item,
+                user_id=self.user_id,
+                image_url=image_url
+            ),
+            return_exceptions=True
+        )
+        
+        # Undo whichever half succeeded: no document pointing at a missing image, no image without its item
+        if isinstance(upload, Exception) and not isinstance(item_doc_id, Exception):
+            await self.appwrite_service.delete_extracted_item(item_doc_id)
+        if isinstance(item_doc_id, Exception) and not isinstance(upload, Exception):
+            await self.appwrite_service.delete_image(file_id)
+        
+        error = upload if isinstance(upload, Exception) else item_doc_id if isinstance(item_doc_id, Exception) else None
+        if error is not None:
+            print(f"Error saving item '{item['name']}' to Appwrite: {str(error)}")
+            # Continue with other items even if one fails
+            item["save_error"] = str(error)
+            return None
+        
+        # Update item with database info
+        item["appwrite_doc_id"] = item_doc_id
+        item["image_url"] = image_url
+        item.pop("save_error", None)
+        
+        print(f"Saved item '{item['name']}' to Appwrite with image URL: {image_url}")
+        return item_doc_id
@@ -0,0 +1,199 @@
+import base64
+import cv2
+import math
+import numpy as np
+from typing import List, Dict, Tuple, Optional
+
+# Size frames are reduced to before any signature is computed
+SIGNATURE_FRAME_SIZE = (64, 36)
+SIGNATURE_THUMB_SIZE = (16, 9)
+SIGNATURE_BINS = 32
+
+# Quality scoring runs on frames downscaled to at most this width
+QUALITY_MAX_WIDTH = 640
+# Exposure limits: mean brightness range and share of crushed/blown pixels tolerated
+MIN_BRIGHTNESS = 40
+MAX_BRIGHTNESS = 215
+MAX_CLIPPED_FRACTION = 0.4
+DARK_LEVEL = 16
+BRIGHT_LEVEL = 239
+
+# Bounding boxes from the vision model use Qwen2-VL's 0-1000 grounding scale
+BBOX_SCALE = 1000
+# Boxes smaller than this share of the frame (per side) are treated as noise
+MIN_BBOX_SIDE = 0.02
+
+# dHash compares horizontally adjacent pixels of a (HASH_SIZE + 1) x HASH_SIZE image -> 64 bits
+HASH_SIZE = 8
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Cheap visual signature: grayscale histogram plus a tiny thumbnail for layout"""
+    
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, SIGNATURE_FRAME_SIZE, interpolation=cv2.INTER_AREA)
+    
+    # Histogram catches lighting/colour changes, the thumbnail catches the camera panning
+    # across surfaces with similar tones; both are scaled so their L1 distances are comparable
+    histogram = np.bincount(small.ravel() // (256 // SIGNATURE_BINS), minlength=SIGNATURE_BINS) / small.size
+    thumb = cv2.resize(small, SIGNATURE_THUMB_SIZE, interpolation=cv2.INTER_AREA).ravel() / 255.0
+    
+    return np.concatenate([histogram, thumb / thumb.size]).astype(np.float32)
+
+def select_distinct_frames(signatures: np.ndarray, count: int) -> List[int]:
+    """Pick the indices of the `count` most mutually distinct signatures (greedy farthest-point)"""
+    
+    total = len(signatures)
+    if total <= count:
+        return list(range(total))
+    
+    # Pairwise L1 distances between all candidates, shape (total, total)
+    distances = np.abs(signatures[:, None, :] - signatures[None, :, :]).sum(axis=2)
+    
+    # Seed with the frame least like the rest, then repeatedly add the frame
+    # farthest from everything already picked
+    picks = [int(distances.sum(axis=1).argmax())]
+    nearest = distances[picks[0]].copy()
+    nearest[picks[0]] = -1
+    
+    while len(picks) < count:
+        pick = int(nearest.argmax())
+        picks.append(pick)
+        nearest = np.minimum(nearest, distances[pick])
+        nearest[pick] = -1
+    
+    return sorted(picks)
+
+def perceptual_hash(frame: np.ndarray) -> str:
+    """64-bit difference hash (dHash) of a frame as a hex string"""
+    
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    
+    value = int(np.packbits(bits).tobytes().hex(), 16)
+    return f"{value:0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two hex perceptual hashes"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+def frame_quality(frame: np.ndarray) -> Dict:
+    """Score sharpness (variance of the Laplacian) and exposure (from the brightness histogram)"""
+    
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    if width > QUALITY_MAX_WIDTH:
+        gray = cv2.resize(gray, (QUALITY_MAX_WIDTH, int(height * QUALITY_MAX_WIDTH / width)), interpolation=cv2.INTER_AREA)
+    
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    
+    histogram = np.bincount(gray.ravel(), minlength=256) / gray.size
+    brightness = float(histogram @ np.arange(256))
+    clipped = float(histogram[:DARK_LEVEL].sum() + histogram[BRIGHT_LEVEL + 1:].sum())
+    
+    return {
+        'sharpness': round(sharpness, 1),
+        'brightness': round(brightness, 1),
+        'clipped': round(clipped, 3),
+        'exposure_ok': MIN_BRIGHTNESS <= brightness <= MAX_BRIGHTNESS and clipped <= MAX_CLIPPED_FRACTION
+    }
+
+def quality_rank(quality: Dict) -> tuple:
+    """Sort key preferring well-exposed frames, then sharper ones"""
+    return (quality['exposure_ok'], quality['sharpness'])
+
+def tile_frames(images: List[np.ndarray], tile_width: int) -> np.ndarray:
+    """Downscale images into a near-square grid, labeling each tile with its index"""
+    
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    
+    # Every tile gets the first frame's aspect ratio; other frames are letterboxed into it
+    first_height, first_width = images[0].shape[:2]
+    tile_height = max(1, int(tile_width * first_height / first_width))
+    
+    mosaic = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    label_scale = max(0.5, tile_height / 240)
+    
+    for index, image in enumerate(images):
+        height, width = image.shape[:2]
+        scale = min(tile_width / width, tile_height / height)
+        resized = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        
+        top = (index // columns) * tile_height + (tile_height - resized.shape[0]) // 2
+        left = (index % columns) * tile_width + (tile_width - resized.shape[1]) // 2
+        mosaic[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+        
+        # High-contrast tile number in the top-left corner
+        label = str(index)
+        (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, label_scale, 2)
+        origin_y = (index // columns) * tile_height
+        origin_x = (index % columns) * tile_width
+        cv2.rectangle(mosaic, (origin_x, origin_y), (origin_x + text_width + 12, origin_y + text_height + baseline + 12), (0, 0, 0), -1)
+        cv2.putText(mosaic, label, (origin_x + 6, origin_y + text_height + 6), cv2.FONT_HERSHEY_SIMPLEX, label_scale, (255, 255, 255), 2)
+    
+    # Thin separators so the model sees tile boundaries
+    for column in range(1, columns):
+        mosaic[:, column * tile_width - 1:column * tile_width + 1] = 255
+    for row in range(1, rows):
+        mosaic[row * tile_height - 1:row * tile_height + 1, :] = 255
+    
+    return mosaic
+
+def encode_frame(frame: np.ndarray, max_edge: int = 0, image_format: str = "jpeg", quality: int = 80) -> Tuple[str, str]:
+    """Downscale so the long edge is at most max_edge (0 keeps full size) and encode as base64
+    
+    Returns (base64 data, mime type).
+    """
+    
+    height, width = frame.shape[:2]
+    long_edge = max(height, width)
+    if max_edge and long_edge > max_edge:
+        scale = max_edge / long_edge
+        frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    
+    if image_format == "webp":
+        ok, buffer = cv2.imencode('.webp', frame, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        mime_type = "image/webp"
+    else:
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        mime_type = "image/jpeg"
+    
+    if not ok:
+        raise Exception(f"Could not encode frame as {image_format}")
+    
+    return base64.b64encode(buffer).decode('utf-8'), mime_type
+
+def parse_bbox(value) -> Optional[Tuple[float, float, float, float]]:
+    """Validate a model-reported [x_min, y_min, x_max, y_max] box on the 0-1000 scale
+    
+    Returns the box normalized to 0-1, or None if it is missing or unusable.
+    """
+    
+    if not isinstance(value, (list, tuple)) or len(value) != 4:
+        return None
+    
+    try:
+        x_min, y_min, x_max, y_max = (min(1.0, max(0.0, float(coord) / BBOX_SCALE)) for coord in value)
+    except (TypeError, ValueError):
+        return None
+    
+    if x_max - x_min < MIN_BBOX_SIDE or y_max - y_min < MIN_BBOX_SIDE:
+        return None
+    
+    return (x_min, y_min, x_max, y_max)
+
+def crop_to_bbox(frame: np.ndarray, bbox: Tuple[float, float, float, float], padding: float = 0.0) -> np.ndarray:
+    """Cut a normalized bounding box out of a frame, widened by `padding` times its size on each side"""
+    
+    height, width = frame.shape[:2]
+    x_min, y_min, x_max, y_max = bbox
+    pad_x = (x_max - x_min) * padding
+    pad_y = (y_max - y_min) * padding
+    
+    left = max(0, int((x_min - pad_x) * width))
+    top = max(0, int((y_min - pad_y) * height))
+    right = min(width, int(math.ceil((x_max + pad_x) * width)))
+    bottom = min(height, int(math.ceil((y_max + pad_y) * height)))
+    
+    return frame[top:bottom, left:right]
@@ -0,0 +1,200 @@
+import config
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Union
+
+# Spilled files are named <sha256><extension> so their type survives a restart
+EXTENSIONS = {"image/jpeg": ".jpg", "image/webp": ".webp"}
+
+class FrameStore:
+    """Content-addressed store for encoded frame and crop images
+    
+    Images are keyed by the sha256 of their bytes, so the same frame referenced by a
+    frame entry and several items is held once. The most recently used images stay in
+    memory up to memory_budget bytes; older ones spill to spill_dir and are read back
+    on demand. Spilled images stay readable after a restart.
+    
+    With write_through every image is written to spill_dir as soon as it is stored, so
+    other workers sharing the directory can serve it; file modification times then
+    record use across workers.
+    """
+    
+    def __init__(self, memory_budget: int = None, spill_dir: str = None, write_through: bool = None):
+        self.memory_budget = memory_budget if memory_budget is not None else config.FRAME_STORE_MEMORY_BYTES
+        self.spill_dir = spill_dir or config.FRAME_STORE_DIR
+        self.write_through = config.FRAME_STORE_WRITE_THROUGH if write_through is None else write_through
+        self.memory_bytes = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mime_types: Dict[str, str] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def put(self, image_data: Union[str, bytes], mime_type: str = "image/jpeg") -> str:
+        """Store base64 (str) or raw (bytes) image data and return its reference"""
+        
+        image_bytes = base64.b64decode(image_data) if isinstance(image_data, str) else image_data
+        ref = hashlib.sha256(image_bytes).hexdigest()
+        
+        with self._lock:
+            if ref in self._memory:
+                self._memory.move_to_end(ref)
+                self._last_used[ref] = time.time()
+            elif ref not in self._mime_types:
+                self._mime_types[ref] = mime_type
+                self._last_used[ref] = time.time()
+                self._memory[ref] = image_bytes
+                self.memory_bytes += len(image_bytes)
+                if self.write_through:
+                    self._write_spill_file(ref, image_bytes)
+                self._evict()
+            else:
+                self._last_used[ref] = time.time()
+        
+        return ref
+    
+    def get(self, ref: str) -> bytes:
+        """Raw image bytes for a reference; raises KeyError if it is not stored"""
+        
+        with self._lock:
+            if ref in self._memory:
+                self._memory.move_to_end(ref)
+                self._last_used[ref] = time.time()
+                image_bytes = self._memory[ref]
+                mime_type = self._mime_types[ref]
+            else:
+                image_bytes = None
+                mime_type = self._mime_types.get(ref) or self._find_spilled(ref)
+                if not mime_type:
+                    raise KeyError(ref)
+        
+        if self.write_through:
+            self._touch(ref, mime_type)
+        if image_bytes is not None:
+            return image_bytes
+        
+        # Spilled: read it back and make it the most recently used again
+        try:
+            with open(self._spill_path(ref, mime_type), 'rb') as spill_file:
+                image_bytes = spill_file.read()
+        except FileNotFoundError:
+            raise KeyError(ref)
+        
+        with self._lock:
+            self._mime_types[ref] = mime_type
+            self._last_used[ref] = time.time()
+            if ref not in self._memory:
+                self._memory[ref] = image_bytes
+                self.memory_bytes += len(image_bytes)
+                self._evict()
+        
+        return image_bytes
+    
+    def get_base64(self, ref: str) -> str:
+        return base64.b64encode(self.get(ref)).decode('utf-8')
+    
+    def mime_type(self, ref: str) -> str:
+        return self._mime_types.get(ref) or self._find_spilled(ref) or "image/jpeg"
+    
+    def __contains__(self, ref: str) -> bool:
+        return ref in self._mime_types or self._find_spilled(ref) is not None
+    
+    def spill(self, refs: Iterable[str]):
+        """Move images to disk now, e.g. once the job using them has finished"""
+        
+        with self._lock:
+            for ref in refs:
+                image_bytes = self._memory.pop(ref, None)
+                if image_bytes is not None:
+                    self.memory_bytes -= len(image_bytes)
+                    self._write_spill_file(ref, image_bytes)
+    
+    def prune(self, max_age: float):
+        """Forget images (in memory and on disk) not used for max_age seconds"""
+        
+        cutoff = time.time() - max_age
+        
+        with self._lock:
+            stale = [ref for ref, last_used in self._last_used.items() if last_used < cutoff]
+            for ref in stale:
+                image_bytes = self._memory.pop(ref, None)
+                if image_bytes is not None:
+                    self.memory_bytes -= len(image_bytes)
+                self._mime_types.pop(ref, None)
+                del self._last_used[ref]
+            recently_used = set(self._last_used)
+        
+        # Files also hold images spilled by earlier runs or other workers; age them by modification time
+        removed = 0
+        try:
+            for entry in os.scandir(self.spill_dir):
+                if entry.name.split('.')[0] not in recently_used and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        except FileNotFoundError:
+            pass
+        
+        if stale or removed:
+            print(f"Pruned {len(stale)} unused images from memory and {removed} from {self.spill_dir}")
+    
+    def stats(self) -> Dict:
+        return {
+            "images": len(self._mime_types),
+            "in_memory": len(self._memory),
+            "memory_bytes": self.memory_bytes
+        }
+    
+    def _evict(self):
+        """Spill least-recently-used images until memory use fits the budget (caller holds the lock)"""
+        
+        while self.memory_bytes > self.memory_budget and len(self._memory) > 1:
+            ref, image_bytes = self._memory.popitem(last=False)
+            self.memory_bytes -= len(image_bytes)
+            self._write_spill_file(ref, image_bytes)
+    
+    def _write_spill_file(self, ref: str, image_bytes: bytes):
+        path = self._spill_path(ref, self._mime_types.get(ref, "image/jpeg"))
+        if os.path.exists(path):
+            return
+        
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as spill_file:
+            spill_file.write(image_bytes)
+        os.replace(temp_path, path)
+    
+    def _touch(self, ref: str, mime_type: str):
+        """Mark a written-through image as used so no worker prunes it"""
+        
+        try:
+            os.utime(self._spill_path(ref, mime_type))
+        except FileNotFoundError:
+            pass
+    
+    def _find_spilled(self, ref: str) -> Optional[str]:
+        """Mime type of an image spilled by an earlier run, if its file exists"""
+        
+        if not re.fullmatch(r"[0-9a-f]{64}", ref or ""):
+            return None
+        
+        for mime_type in EXTENSIONS:
+            if os.path.exists(self._spill_path(ref, mime_type)):
+                return mime_type
+        return None
+    
+    def _spill_path(self, ref: str, mime_type: str) -> str:
+        return os.path.join(self.spill_dir, ref + EXTENSIONS.get(mime_type, ".jpg"))
+
+def image_refs(entries: Iterable[Dict]) -> set:
+    """References of every image the given frame and item dicts point to"""
+    
+    return {
+        entry.get(key)
+        for entry in entries
+        for key in ("frame_ref", "original_frame_ref")
+    } - {None}
@@ -0,0 +1,81 @@
+import config
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+from services.state_backend import StateBackend, get_state_backend
+
+# A status event with one of these ends the job's event stream
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class JobEventLog:
+    """Per-job log of extraction events with fan-out to every subscriber of a job
+    
+    Events are numbered per job and kept (up to max_events) in the shared state backend,
+    so a client reconnecting with Last-Event-ID - to this or any other worker - gets what
+    it missed. Subscribers in this process are woken as soon as an event is published;
+    events published by other workers are picked up every SSE_POLL_SECONDS.
+    """
+    
+    NAMESPACE = "extraction_events"
+    
+    def __init__(self, backend: StateBackend = None, max_events: int = None):
+        self.state = backend or get_state_backend()
+        self.max_events = max_events or config.JOB_EVENT_LOG_SIZE
+        self._signals: Dict[str, asyncio.Event] = {}
+    
+    def publish(self, job_id: str, event: str, data: Dict) -> int:
+        """Append an event to the job's log and wake its subscribers; returns the event id"""
+        
+        def append(log: Dict) -> Dict:
+            log["last_id"] += 1
+            log["events"].append({"id": log["last_id"], "event": event, "data": data})
+            del log["events"][:-self.max_events]
+            return log
+        
+        log = self.state.update(self.NAMESPACE, job_id, append, default={"last_id": 0, "events": []}, ttl=config.JOB_TTL_SECONDS)
+        
+        # Replace the signal so subscribers that wake up wait on a fresh one next time
+        signal = self._signals.pop(job_id, None)
+        if signal:
+            signal.set()
+        
+        return log["last_id"]
+    
+    def since(self, job_id: str, last_id: int) -> Tuple[List[Dict], bool]:
+        """Events after last_id, and whether some were already dropped from the log"""
+        
+        log = self.state.get(self.NAMESPACE, job_id) or {"last_id": 0, "events": []}
+        events = [event for event in log["events"] if event["id"] > last_id]
+        oldest_id = log["events"][0]["id"] if log["events"] else log["last_id"] + 1
+        return events, oldest_id > last_id + 1 and last_id < log["last_id"]
+    
+    def last_id(self, job_id: str) -> int:
+        log = self.state.get(self.NAMESPACE, job_id)
+        return log["last_id"] if log else 0
+    
+    async def wait(self, job_id: str, timeout: float):
+        """Return when an event is published for the job in this process, or after timeout"""
+        
+        signal = self._signals.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(signal.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def job_ids(self) -> List[str]:
+        return self.state.keys(self.NAMESPACE)
+    
+    def delete(self, job_id: str):
+        self.state.delete(self.NAMESPACE, job_id)
+        self._signals.pop(job_id, None)
+
+def format_sse(data: Any, event: str = None, event_id: int = None) -> str:
+    """Encode one server-sent event"""
+    
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,105 @@
+import config
+import asyncio
+import heapq
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class JobScheduler:
+    """Runs extraction jobs in this worker, at most max_concurrent at a time
+    
+    Jobs wait in a priority queue (lower first, FIFO within a priority) and each running
+    job is cancelled after timeout seconds. on_queue_change(job_ids) is called with the
+    queued jobs in order whenever the queue changes, e.g. to publish queue positions.
+    A job that is cancelled or times out sees CancelledError; cancel_reason() tells it why.
+    """
+    
+    def __init__(self, max_concurrent: int = None, timeout: float = None,
+                 on_queue_change: Callable[[List[str]], None] = None):
+        self.max_concurrent = max_concurrent or config.EXTRACTION_MAX_CONCURRENT_JOBS
+        self.timeout = timeout or config.EXTRACTION_JOB_TIMEOUT_SECONDS
+        self.on_queue_change = on_queue_change
+        self._queue: List[tuple] = []
+        self._order = itertools.count()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_reasons: Dict[str, str] = {}
+    
+    def submit(self, job_id: str, run: Callable[[], Awaitable], priority: int = 0):
+        """Queue run() for a job; it starts as soon as a slot is free"""
+        
+        heapq.heappush(self._queue, (priority, next(self._order), job_id, run))
+        self._start_next()
+        self._queue_changed()
+    
+    def queued(self) -> List[str]:
+        return [job_id for _, _, job_id, _ in sorted(self._queue)]
+    
+    def running(self) -> List[str]:
+        return list(self._running)
+    
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based place in the queue, 0 if running, None if this worker does not have the job"""
+        
+        if job_id in self._running:
+            return 0
+        queued = self.queued()
+        return queued.index(job_id) + 1 if job_id in queued else None
+    
+    def cancel(self, job_id: str, reason: str = "cancelled") -> bool:
+        """Drop a queued job or cancel a running one; False if this worker does not have it"""
+        
+        for entry in self._queue:
+            if entry[2] == job_id:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._queue_changed()
+                return True
+        
+        task = self._running.get(job_id)
+        if task is None:
+            return False
+        self._cancel_reasons[job_id] = reason
+        task.cancel()
+        return True
+    
+    def cancel_reason(self, job_id: str) -> Optional[str]:
+        """"cancelled" or "timeout" if the scheduler cancelled the job, None otherwise (e.g. shutdown)"""
+        return self._cancel_reasons.get(job_id)
+    
+    async def shutdown(self):
+        """Cancel running jobs without a reason, so they keep what they need to resume later"""
+        
+        self._queue.clear()
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def stats(self) -> Dict:
+        return {
+            "running": len(self._running),
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent
+        }
+    
+    def _start_next(self):
+        started = False
+        while self._queue and len(self._running) < self.max_concurrent:
+            _, _, job_id, run = heapq.heappop(self._queue)
+            task = asyncio.create_task(run())
+            self._running[job_id] = task
+            
+            timer = asyncio.get_running_loop().call_later(self.timeout, self.cancel, job_id, "timeout")
+            task.add_done_callback(lambda task, job_id=job_id, timer=timer: self._finished(job_id, timer))
+            started = True
+        return started
+    
+    def _finished(self, job_id: str, timer: asyncio.TimerHandle):
+        timer.cancel()
+        self._running.pop(job_id, None)
+        self._cancel_reasons.pop(job_id, None)
+        if self._start_next():
+            self._queue_changed()
+    
+    def _queue_changed(self):
+        if self.on_queue_change:
+            self.on_queue_change(self.queued())
@@ -0,0 +1,275 @@
+import config
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services.state_backend import StateBackend, get_state_backend, WORKER_ID
+
+# Jobs in these states are never touched again by the pipeline and may be evicted
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Fields returned by the status endpoint; each records the job version it last changed in
+VERSIONED_FIELDS = ("status", "queue_position", "progress", "filename", "frames", "items", "dedup_ratio", "first_item_seconds", "error")
+
+class JobStore(ABC):
+    """Where sell-mode extraction jobs live between the upload and the last status poll
+    
+    Jobs are plain dicts. Code that changes a job calls save() so the change is persisted
+    and accounted for; while a job is processing the pipeline updates its dict in place.
+    """
+    
+    def create(self, job_id: str, job: Dict) -> Dict:
+        job["created_at"] = time.time()
+        self.save(job_id, job)
+        return job
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        pass
+    
+    @abstractmethod
+    def save(self, job_id: str, job: Dict):
+        pass
+    
+    @abstractmethod
+    def delete(self, job_id: str):
+        pass
+    
+    def recover_interrupted(self) -> List[Tuple[str, Dict]]:
+        """Claim jobs left processing by a worker that is gone (or a previous run of the server)"""
+        return []
+    
+    def release_claim(self, job_id: str):
+        """Give up a job claimed by recover_interrupted() without processing it"""
+        pass
+    
+    def renew_leases(self):
+        """Keep this worker's claim on the jobs it is processing"""
+        pass
+    
+    @abstractmethod
+    def request_cancel(self, job_id: str):
+        """Ask whichever worker has the job to cancel it"""
+        pass
+    
+    @abstractmethod
+    def cancel_requested(self, job_id: str) -> bool:
+        pass
+    
+    @abstractmethod
+    def clear_cancel_request(self, job_id: str):
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict:
+        pass
+    
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+    
+    def __getitem__(self, job_id: str) -> Dict:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+    
+    def _stamp(self, job: Dict):
+        """Bump job["version"] if any status field changed, recording the version per field"""
+        
+        field_hashes = job.setdefault("field_hashes", {})
+        field_versions = job.setdefault("field_versions", {})
+        
+        changed = []
+        for field in VERSIONED_FIELDS:
+            # Digests (not Python hash()) so every worker agrees on them
+            digest = hashlib.blake2b(json.dumps(job.get(field), sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+            if field_hashes.get(field) != digest:
+                field_hashes[field] = digest
+                changed.append(field)
+        
+        if changed:
+            job["version"] = job.get("version", 0) + 1
+            for field in changed:
+                field_versions[field] = job["version"]
+        
+        job["updated_at"] = time.time()
+    
+    def _expired(self, job: Dict, now: float) -> bool:
+        return job.get("status") in FINISHED_STATUSES and job.get("updated_at", now) < now - config.JOB_TTL_SECONDS
+
+class MemoryJobStore(JobStore):
+    """In-process LRU of jobs with TTL and size limits; nothing survives a restart"""
+    
+    def __init__(self, max_jobs: int = None, max_bytes: int = None):
+        self.max_jobs = max_jobs or config.JOB_STORE_MAX_JOBS
+        self.max_bytes = max_bytes or config.JOB_STORE_MAX_BYTES
+        self.total_bytes = 0
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._cancel_requests = set()
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        
+        if self._expired(job, time.time()):
+            self.delete(job_id)
+            return None
+        
+        self._jobs.move_to_end(job_id)
+        return job
+    
+    def __contains__(self, job_id: str) -> bool:
+        # Unlike get(), a membership check doesn't count as use for the LRU
+        job = self._jobs.get(job_id)
+        return job is not None and not self._expired(job, time.time())
+    
+    def save(self, job_id: str, job: Dict):
+        self._stamp(job)
+        self._jobs[job_id] = job
+        self._jobs.move_to_end(job_id)
+        
+        size = len(json.dumps(job, default=str))
+        self.total_bytes += size - self._sizes.get(job_id, 0)
+        self._sizes[job_id] = size
+        
+        self._evict()
+    
+    def delete(self, job_id: str):
+        self._jobs.pop(job_id, None)
+        self.total_bytes -= self._sizes.pop(job_id, 0)
+    
+    def request_cancel(self, job_id: str):
+        self._cancel_requests.add(job_id)
+    
+    def cancel_requested(self, job_id: str) -> bool:
+        return job_id in self._cancel_requests
+    
+    def clear_cancel_request(self, job_id: str):
+        self._cancel_requests.discard(job_id)
+    
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "jobs": len(self._jobs),
+            "processing": sum(1 for job in self._jobs.values() if job.get("status") not in FINISHED_STATUSES),
+            "bytes": self.total_bytes
+        }
+    
+    def _evict(self):
+        """Drop expired finished jobs, then least recently used finished jobs while over the limits"""
+        
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if self._expired(job, now):
+                self.delete(job_id)
+        
+        # Oldest first; processing jobs are skipped, never evicted
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) <= self.max_jobs and self.total_bytes <= self.max_bytes:
+                break
+            if job.get("status") in FINISHED_STATUSES:
+                print(f"Evicting extraction job {job_id} from the job store")
+                self.delete(job_id)
+
+class SharedJobStore(JobStore):
+    """Jobs kept in the shared state backend, so every uvicorn worker can serve them
+    
+    The worker processing a job holds a lease on it and keeps the live dict in memory;
+    other workers read the copy saved in the backend. When a worker dies its leases
+    expire and recover_interrupted() hands its jobs to whichever worker claims them
+    first, so each extraction runs in exactly one place.
+    """
+    
+    NAMESPACE = "extraction_jobs"
+    # Index of processing jobs, so recovery does not scan every job
+    ACTIVE_NAMESPACE = "active_extraction_jobs"
+    # Cancellations requested on a worker other than the one running the job
+    CANCEL_NAMESPACE = "extraction_cancellations"
+    
+    def __init__(self, backend: StateBackend = None):
+        self.backend = backend or get_state_backend()
+        self._live: Dict[str, Dict] = {}
+    
+    def create(self, job_id: str, job: Dict) -> Dict:
+        self.backend.claim(self._lease(job_id), WORKER_ID, config.JOB_LEASE_SECONDS)
+        return super().create(job_id, job)
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        if job_id in self._live:
+            return self._live[job_id]
+        return self.backend.get(self.NAMESPACE, job_id)
+    
+    def save(self, job_id: str, job: Dict):
+        self._stamp(job)
+        
+        if job.get("status") in FINISHED_STATUSES:
+            self._live.pop(job_id, None)
+            self.backend.set(self.NAMESPACE, job_id, job, ttl=config.JOB_TTL_SECONDS)
+            self.backend.delete(self.ACTIVE_NAMESPACE, job_id)
+            self.backend.release(self._lease(job_id), WORKER_ID)
+        else:
+            self._live[job_id] = job
+            self.backend.set(self.NAMESPACE, job_id, job)
+            self.backend.set(self.ACTIVE_NAMESPACE, job_id, WORKER_ID)
+    
+    def delete(self, job_id: str):
+        self._live.pop(job_id, None)
+        self.backend.delete(self.NAMESPACE, job_id)
+        self.backend.delete(self.ACTIVE_NAMESPACE, job_id)
+        self.backend.release(self._lease(job_id), WORKER_ID)
+    
+    def renew_leases(self):
+        for job_id in list(self._live):
+            if not self.backend.renew(self._lease(job_id), WORKER_ID, config.JOB_LEASE_SECONDS):
+                print(f"Lost the lease on extraction job {job_id}; another worker may take it over")
+    
+    def request_cancel(self, job_id: str):
+        self.backend.set(self.CANCEL_NAMESPACE, job_id, True, ttl=config.JOB_TTL_SECONDS)
+    
+    def cancel_requested(self, job_id: str) -> bool:
+        return bool(self.backend.get(self.CANCEL_NAMESPACE, job_id))
+    
+    def clear_cancel_request(self, job_id: str):
+        self.backend.delete(self.CANCEL_NAMESPACE, job_id)
+    
+    def recover_interrupted(self) -> List[Tuple[str, Dict]]:
+        recovered = []
+        
+        for job_id in self.backend.keys(self.ACTIVE_NAMESPACE):
+            # A live lease means some worker is still processing it
+            if job_id in self._live or not self.backend.claim(self._lease(job_id), WORKER_ID, config.JOB_LEASE_SECONDS):
+                continue
+            
+            job = self.backend.get(self.NAMESPACE, job_id)
+            if job is None:
+                self.delete(job_id)
+                continue
+            recovered.append((job_id, job))
+        
+        return recovered
+    
+    def release_claim(self, job_id: str):
+        self.backend.release(self._lease(job_id), WORKER_ID)
+    
+    def stats(self) -> Dict:
+        return {
+            "backend": "shared",
+            "jobs": self.backend.stats(self.NAMESPACE)["keys"],
+            "processing": len(self.backend.keys(self.ACTIVE_NAMESPACE)),
+            "processing_here": len(self._live),
+            "bytes": self.backend.stats(self.NAMESPACE)["bytes"]
+        }
+    
+    def _lease(self, job_id: str) -> str:
+        return f"extraction_job:{job_id}"
+
+def create_job_store() -> JobStore:
+    """Job store for the configured STATE_BACKEND"""
+    
+    if config.STATE_BACKEND == "memory":
+        return MemoryJobStore()
+    return SharedJobStore()
@@ -3,6 +3,7 @@ from openai import OpenAI
 import json
 from typing import Dict, List
 import uuid
+from services.state_backend import get_state_backend
 
 class ListingGenerator:
     def __init__(self):
@@ -11,8 +12,8 @@ class ListingGenerator:
             api_key=config.NEBIUS_API_KEY
         )
         
-        # Store active negotiations
-        self.negotiations = {}
+        # Active negotiations live in the shared state backend so any worker can continue them
+        self.state = get_state_backend()
     
     async def create_listing(self, item: Dict) -> Dict:
         """Generate marketplace listing for an item"""
@@ -54,7 +55,7 @@ class ListingGenerator:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{item['frame_data']}"
+                                    "url": f"data:{item.get('mime_type', 'image/jpeg')};base64,{item['frame_data']}"
                                 }
                             }
                         ]
@@ -98,7 +99,8 @@ class ListingGenerator:
                 "condition": item['condition'],
                 "condition_details": listing_data.get("condition_details", ""),
                 "category": item['category'],
-                "image_data": item['frame_data'],
+                "image_ref": item.get('frame_ref'),
+                "mime_type": item.get('mime_type', 'image/jpeg'),
                 "timestamp": item['timestamp'],
                 "status": "draft",
                 "ai_response": ai_response
@@ -114,15 +116,17 @@ class ListingGenerator:
         
         try:
             # Get or create negotiation context
-            if listing_id not in self.negotiations:
-                self.negotiations[listing_id] = {
-                    "messages": [],
-                    "current_price": current_price,
-                    "min_price": current_price * 0.7  # Default 30% discount limit
-                }
-            
-            negotiation = self.negotiations[listing_id]
-            negotiation["messages"].append({"role": "buyer", "message": buyer_message})
+            new_negotiation = {
+                "messages": [],
+                "current_price": current_price,
+                "min_price": current_price * 0.7  # Default 30% discount limit
+            }
+            buyer_entry = {"role": "buyer", "message": buyer_message}
+            negotiation = self.state.update(
+                "negotiations", listing_id,
+                lambda negotiation: {**negotiation, "messages": negotiation["messages"] + [buyer_entry]},
+                default=new_negotiation
+            )
             
             prompt = f"""
             You are a friendly seller negotiating the price of an item. 
@@ -181,10 +185,15 @@ class ListingGenerator:
                 }
             
             # Store seller response
-            negotiation["messages"].append({
+            seller_entry = {
                 "role": "seller", 
                 "message": negotiation_result.get("response", "")
-            })
+            }
+            negotiation = self.state.update(
+                "negotiations", listing_id,
+                lambda negotiation: {**negotiation, "messages": negotiation["messages"] + [seller_entry]},
+                default=negotiation
+            )
             
             return {
                 "listing_id": listing_id,
@@ -4,6 +4,7 @@ import json
 from typing import Dict, List
 import time
 from datetime import datetime, timedelta
+from services.state_backend import get_state_backend
 
 class NegotiationAI:
     def __init__(self):
@@ -12,8 +13,8 @@ class NegotiationAI:
             api_key=config.NEBIUS_API_KEY
         )
         
-        # Store conversation history
-        self.conversations = {}
+        # Conversation history lives in the shared state backend so any worker can continue it
+        self.state = get_state_backend()
         
     def handle_buyer_message(self, listing_id: str, buyer_message: str, listing_data: Dict, conversation_history: List = None):
         """Generate AI response to buyer message"""
@@ -109,13 +110,11 @@ class NegotiationAI:
                 }
             
             # Store conversation
-            if listing_id not in self.conversations:
-                self.conversations[listing_id] = []
-                
-            self.conversations[listing_id].extend([
+            new_messages = [
                 {"role": "buyer", "message": buyer_message, "timestamp": datetime.now().isoformat()},
                 {"role": "seller", "message": result["response"], "timestamp": datetime.now().isoformat()}
-            ])
+            ]
+            conversation = self.state.update("conversations", listing_id, lambda messages: messages + new_messages, default=[])
             
             return {
                 "listing_id": listing_id,
@@ -124,7 +123,7 @@ class NegotiationAI:
                 "suggested_price": result.get("suggested_price"),
                 "confidence": result.get("confidence", 0.7),
                 "next_steps": result.get("next_steps", ""),
-                "conversation_history": self.conversations[listing_id]
+                "conversation_history": conversation
             }
             
         except Exception as e:
@@ -215,7 +214,7 @@ class NegotiationAI:
     
     def get_conversation_history(self, listing_id: str):
         """Get conversation history for a listing"""
-        return self.conversations.get(listing_id, [])
+        return self.state.get("conversations", listing_id) or []
     
     def analyze_buyer_intent(self, message: str):
         """Analyze what the buyer wants"""
@@ -0,0 +1,198 @@
+import config
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Words in product queries that say nothing about the product itself
+STOPWORDS = {"a", "an", "and", "the", "for", "of", "in", "with", "to", "buy", "online", "shop", "home", "decor"}
+
+class ProductIndex:
+    """Full-text index (SQLite FTS5) of every product Tavily has returned
+    
+    Products are keyed by URL; indexing one again refreshes it. lookup() answers a
+    query only when enough products indexed within max_age match it, so lookups it
+    can't answer well still go to Tavily. fallback() matches products of any age, for
+    when Tavily returns nothing.
+    """
+    
+    # Seconds between trims down to max_products
+    TRIM_INTERVAL = 60
+    
+    def __init__(self, path: str = None, min_hits: int = None, max_age: float = None, max_products: int = None):
+        self.path = path or config.PRODUCT_INDEX_DB_PATH
+        self.min_hits = min_hits or config.PRODUCT_INDEX_MIN_HITS
+        self.max_age = max_age if max_age is not None else config.PRODUCT_INDEX_MAX_AGE_SECONDS
+        self.max_products = max_products or config.PRODUCT_INDEX_MAX_PRODUCTS
+        self._counters = {"hits": 0, "misses": 0, "fallbacks": 0, "indexed": 0}
+        self._last_trim = 0.0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    store TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    suggestion_item TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS products_indexed_at ON products (indexed_at)")
+            # External-content FTS table kept in sync with products by the triggers below
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                    title, description, category, suggestion_item,
+                    content='products', content_rowid='id', tokenize='porter unicode61'
+                )
+            """)
+            self._conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+                    INSERT INTO products_fts (rowid, title, description, category, suggestion_item)
+                    VALUES (new.id, new.title, new.description, new.category, new.suggestion_item);
+                END
+            """)
+            self._conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, title, description, category, suggestion_item)
+                    VALUES ('delete', old.id, old.title, old.description, old.category, old.suggestion_item);
+                END
+            """)
+            self._conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, title, description, category, suggestion_item)
+                    VALUES ('delete', old.id, old.title, old.description, old.category, old.suggestion_item);
+                    INSERT INTO products_fts (rowid, title, description, category, suggestion_item)
+                    VALUES (new.id, new.title, new.description, new.category, new.suggestion_item);
+                END
+            """)
+    
+    def add(self, products: List[Dict]):
+        """Index (or refresh) products found by a search"""
+        
+        now = time.time()
+        rows = [
+            (
+                product['url'], product['title'], product.get('description', ''), product.get('store', ''),
+                product.get('category', ''), product.get('suggestion_item', ''), now
+            )
+            for product in products
+            if product.get('url') and product.get('title')
+        ]
+        if not rows:
+            return
+        
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """INSERT INTO products (url, title, description, store, category, suggestion_item, indexed_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (url) DO UPDATE SET
+                           title = excluded.title, description = excluded.description, store = excluded.store,
+                           category = excluded.category, suggestion_item = excluded.suggestion_item,
+                           indexed_at = excluded.indexed_at""",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        self._counters["indexed"] += len(rows)
+        if now - self._last_trim > self.TRIM_INTERVAL:
+            self._trim()
+    
+    def lookup(self, query: str, limit: int) -> Optional[List[Dict]]:
+        """Best fresh matches for query, or None when there are fewer than min_hits"""
+        
+        products = self.search(query, limit, max_age=self.max_age)
+        if len(products) >= min(self.min_hits, limit):
+            self._counters["hits"] += 1
+            return products
+        
+        self._counters["misses"] += 1
+        return None
+    
+    def fallback(self, query: str, limit: int) -> List[Dict]:
+        """Best matches for query however old, for when Tavily has nothing"""
+        
+        products = self.search(query, limit)
+        if products:
+            self._counters["fallbacks"] += 1
+        return products
+    
+    def search(self, query: str, limit: int, max_age: float = None) -> List[Dict]:
+        """Products matching every meaningful word of query, best BM25 rank first"""
+        
+        match = self._match_expression(query)
+        if not match:
+            return []
+        
+        indexed_after = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT p.title, p.url, p.description, p.store, p.category, p.suggestion_item
+                   FROM products_fts JOIN products p ON p.id = products_fts.rowid
+                   WHERE products_fts MATCH ? AND p.indexed_at >= ?
+                   ORDER BY bm25(products_fts, 10.0, 1.0, 2.0, 5.0) LIMIT ?""",
+                (match, indexed_after, limit)
+            ).fetchall()
+        
+        return [
+            {
+                "title": title,
+                "url": url,
+                "description": description,
+                "category": category,
+                "suggestion_item": suggestion_item,
+                "source": "local_index",
+                "store": store
+            }
+            for title, url, description, store, category, suggestion_item in rows
+        ]
+    
+    def metrics(self) -> Dict:
+        with self._lock:
+            products = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        lookups = self._counters["hits"] + self._counters["misses"]
+        
+        return {
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            "products": products
+        }
+    
+    def _match_expression(self, query: str) -> str:
+        """FTS5 query requiring every word of query that names the product"""
+        
+        words = [word for word in re.findall(r"\w+", query.lower()) if word not in STOPWORDS]
+        # Quoted, so words like AND/NOT/NEAR are never read as operators
+        return " ".join(f'"{word}"' for word in dict.fromkeys(words))
+    
+    def _trim(self):
+        """Drop the oldest products beyond max_products"""
+        
+        self._last_trim = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM products WHERE id IN (SELECT id FROM products ORDER BY indexed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_products,)
+            )
+
+def create_product_index() -> Optional[ProductIndex]:
+    """Product index for the configured PRODUCT_INDEX_* settings, or None when it is disabled"""
+    
+    return ProductIndex() if config.PRODUCT_INDEX_ENABLED else None
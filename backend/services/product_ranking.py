@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the click, never select a different product
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "dclid", "yclid", "igshid", "mc_cid", "mc_eid", "srsltid",
+    "ref", "ref_", "referrer", "tag", "spm", "psc", "_ga"
+}
+
+# Words that appear in product titles without describing the product
+TITLE_NOISE = {
+    "buy", "online", "shop", "the", "a", "an", "and", "for", "with", "of", "com", "www",
+    "amazon", "wayfair", "target", "ikea", "home", "depot", "lowe", "lowes", "overstock", "cb2", "crate", "barrel"
+}
+
+PRIORITY_SCORES = {"high": 2.0, "medium": 1.0, "low": 0.0}
+
+def canonical_url(url: str) -> str:
+    """URL without tracking parameters, fragment, www. or trailing slash, so copies of a product link compare equal"""
+    
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    
+    # Amazon appends /ref=... path segments for tracking as well
+    path = re.sub(r"/ref=[^/]*$", "", parts.path).rstrip("/")
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith("utm_")
+    ))
+    
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+def title_key(title: str, url: str) -> str:
+    """Order-insensitive fingerprint of a title's meaningful words on the URL's site
+    
+    Equal keys mean the same listing; the same title on another store's site is another offer.
+    Empty when the title has no meaningful words.
+    """
+    
+    words = " ".join(sorted(set(re.findall(r"[a-z0-9]+", title.lower())) - TITLE_NOISE))
+    return f"{urlsplit(canonical_url(url)).netloc}|{words}" if words else ""
+
+def score_product(product: Dict, item: str) -> float:
+    """Higher for higher-priority suggestions, results naming the item, and known stores"""
+    
+    item_words = set(re.findall(r"[a-z0-9]+", item.lower()))
+    text_words = set(re.findall(r"[a-z0-9]+", f"{product['title']} {product['description']}".lower()))
+    relevance = len(item_words & text_words) / len(item_words) if item_words else 0.0
+    
+    return (
+        PRIORITY_SCORES.get(product.get('priority'), 0.0) * 2
+        + relevance
+        + (0.5 if product.get('store', 'Online Store') != 'Online Store' else 0.0)
+    )
+
+class ProductAggregator:
+    """Collects product results per suggestion, deduplicated and scored as they arrive
+    
+    Within a suggestion, a result whose canonical URL, or title fingerprint on the same
+    site, was already added is dropped, so add() and count() are O(1). Products keep
+    the URL they were found with; the canonical form is only compared. results() ranks every suggestion's
+    products by score, drops products already taken by a better-ranked suggestion, and
+    keeps at most per_suggestion products for each.
+    """
+    
+    def __init__(self, per_suggestion: int):
+        self.per_suggestion = per_suggestion
+        self._products: List[Dict] = []
+        self._seen: Dict[int, set] = {}
+        self._counts: Dict[int, int] = {}
+    
+    def add(self, suggestion_index: int, item: str, product: Dict) -> Optional[Dict]:
+        """Add a result for a suggestion; returns it, or None if it is a duplicate"""
+        
+        keys = {("url", canonical_url(product['url'])), ("title", title_key(product['title'], product['url']))} - {("title", "")}
+        seen = self._seen.setdefault(suggestion_index, set())
+        if keys & seen:
+            return None
+        
+        seen |= keys
+        position = self._counts.get(suggestion_index, 0)
+        self._counts[suggestion_index] = position + 1
+        self._products.append({
+            "product": product,
+            "keys": keys,
+            "suggestion": suggestion_index,
+            # Ties keep suggestion order, then the order results arrived in for the suggestion
+            "rank": (-score_product(product, item), suggestion_index, position)
+        })
+        return product
+    
+    def count(self, suggestion_index: int) -> int:
+        return self._counts.get(suggestion_index, 0)
+    
+    def results(self) -> List[Dict]:
+        taken = set()
+        kept: Dict[int, int] = {}
+        products = []
+        
+        for entry in sorted(self._products, key=lambda entry: entry["rank"]):
+            if entry["keys"] & taken or kept.get(entry["suggestion"], 0) >= self.per_suggestion:
+                continue
+            taken |= entry["keys"]
+            kept[entry["suggestion"]] = kept.get(entry["suggestion"], 0) + 1
+            products.append(entry["product"])
+        
+        return products
@@ -1,63 +1,99 @@
 from tavily import TavilyClient
 import config
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
+from services.product_index import create_product_index
+from services.product_ranking import ProductAggregator
+from services.search_cache import SearchCache, create_search_cache
+from services.single_flight import SingleFlight
+
+# The Tavily client is synchronous; every ProductSearchService shares this pool, which caps requests in flight
+_search_executor = ThreadPoolExecutor(max_workers=config.TAVILY_MAX_CONCURRENCY, thread_name_prefix="tavily")
+
+# Tavily results by normalized query, shared by every ProductSearchService
+search_cache = create_search_cache()
+
+# Identical queries in flight at the same time (cache misses or refreshes) share one Tavily request
+search_flights = SingleFlight()
+
+# Every product Tavily returns, for answering lookups locally and when Tavily fails
+product_index = create_product_index()
 
 class ProductSearchService:
+    # Later queries for a suggestion are skipped once it has this many products
+    PRODUCTS_PER_SUGGESTION = 2
+    
     def __init__(self):
         self.client = TavilyClient(api_key=config.TAVILY_API_KEY)
+        self.cache = search_cache
+        self.flights = search_flights
+        self.index = product_index
+    
+    async def _search(self, query: str, max_results: int) -> Dict:
+        """Tavily results for a query, from the search cache when it has them"""
+        
+        key = SearchCache.key(query, search_depth="basic", max_results=max_results)
+        return await self.cache.get_or_fetch(key, lambda: self.flights.do(key, lambda: self._search_tavily(query, max_results, key)))
+    
+    async def _search_tavily(self, query: str, max_results: int, cache_key: str) -> Dict:
+        """Run one Tavily search on the shared pool; returns {} if it fails or times out
+        
+        If the caller gives up (cancellation or timeout) before a pool thread picks the
+        request up, it never reaches Tavily. If it is already running, it still completes
+        and is billed, so its result goes into the search cache under cache_key.
+        """
+        
+        loop = asyncio.get_running_loop()
+        request = _search_executor.submit(functools.partial(
+            self.client.search,
+            query=query,
+            search_depth="basic",  # Changed from "advanced"
+            max_results=max_results,
+            timeout=config.TAVILY_QUERY_TIMEOUT
+            # Removed include_domains restriction
+        ))
+        
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(request), config.TAVILY_QUERY_TIMEOUT)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            # cancel() only succeeds while the request is still queued
+            if not request.cancel():
+                request.add_done_callback(lambda request: self._hand_back(loop, cache_key, request))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            print(f"Tavily search for query '{query}' timed out after {config.TAVILY_QUERY_TIMEOUT}s")
+        except Exception as e:
+            print(f"Error in Tavily search for query '{query}': {str(e)}")
+        return {}
+    
+    def _hand_back(self, loop: asyncio.AbstractEventLoop, cache_key: str, request):
+        """Pass a late result from the pool thread to the event loop that owns the cache"""
+        
+        try:
+            loop.call_soon_threadsafe(self._cache_late_result, cache_key, request)
+        except RuntimeError:
+            # The loop has shut down, and the cache went with it
+            pass
+    
+    def _cache_late_result(self, cache_key: str, request):
+        if not request.cancelled() and request.exception() is None:
+            self.cache.put(cache_key, request.result())
     
     async def search_products(self, suggestions: List[Dict]) -> List[Dict]:
-        """Search for products based on room analysis suggestions"""
-        products = []
+        """Search for products based on room analysis suggestions
         
-        for suggestion in suggestions:
-            try:
-                # Simplified search queries
-                queries = [
-                    f"{suggestion['item']} buy online",
-                    f"shop {suggestion['item']} home decor"
-                ]
-                
-                for query in queries:
-                    try:
-                        # Search using Tavily with simplified parameters
-                        response = self.client.search(
-                            query=query,
-                            search_depth="basic",  # Changed from "advanced"
-                            max_results=3,
-                            # Removed include_domains restriction
-                        )
-                        
-                        # Process results
-                        for result in response.get('results', []):
-                            url = result.get('url', '')
-                            title = result.get('title', '')
-                            
-                            # Basic filtering for product-like content
-                            if title and url:
-                                product = {
-                                    "title": title,
-                                    "url": url,
-                                    "description": result.get('content', '')[:200] + "...",
-                                    "category": suggestion['category'],
-                                    "suggestion_item": suggestion['item'],
-                                    "priority": suggestion['priority'],
-                                    "source": "tavily_search",
-                                    "store": self._extract_store_name(url)
-                                }
-                                products.append(product)
-                        
-                        # Limit products per suggestion
-                        if len([p for p in products if p['suggestion_item'] == suggestion['item']]) >= 2:
-                            break
-                            
-                    except Exception as e:
-                        print(f"Error in Tavily search for query '{query}': {str(e)}")
-                        continue
-                        
-            except Exception as e:
-                print(f"Error searching for {suggestion['item']}: {str(e)}")
-                continue
+        Every suggestion's queries run at once. Duplicate products are dropped and the rest
+        ranked by score (priority, relevance to the item, store), at most
+        PRODUCTS_PER_SUGGESTION per suggestion.
+        """
+        
+        aggregator = ProductAggregator(self.PRODUCTS_PER_SUGGESTION)
+        await asyncio.gather(*(
+            self._search_suggestion(index, suggestion, aggregator) for index, suggestion in enumerate(suggestions)
+        ))
+        products = aggregator.results()
         
         # If no products found, add fallback products
         if not products:
@@ -65,6 +101,67 @@ class ProductSearchService:
         
         return products
     
+    async def _search_suggestion(self, index: int, suggestion: Dict, aggregator: ProductAggregator):
+        """Add products for one suggestion to aggregator, from its queries in order until it has enough"""
+        
+        products = []
+        searches = []
+        
+        try:
+            # Simplified search queries
+            queries = [
+                f"{suggestion['item']} buy online",
+                f"shop {suggestion['item']} home decor"
+            ]
+            
+            # Issued together; a later query's results are only used if the earlier ones fell short
+            searches = [asyncio.create_task(self._search(query, max_results=3)) for query in queries]
+            
+            for search in searches:
+                response = await search
+                
+                # Process results
+                for result in response.get('results', []):
+                    url = result.get('url', '')
+                    title = result.get('title', '')
+                    
+                    # Basic filtering for product-like content
+                    if title and url:
+                        product = {
+                            "title": title,
+                            "url": url,
+                            "description": result.get('content', '')[:200] + "...",
+                            "category": suggestion['category'],
+                            "suggestion_item": suggestion['item'],
+                            "priority": suggestion['priority'],
+                            "source": "tavily_search",
+                            "store": self._extract_store_name(url)
+                        }
+                        product = aggregator.add(index, suggestion['item'], product)
+                        if product:
+                            products.append(product)
+                
+                # Limit products per suggestion
+                if aggregator.count(index) >= self.PRODUCTS_PER_SUGGESTION:
+                    break
+            
+        except Exception as e:
+            print(f"Error searching for {suggestion['item']}: {str(e)}")
+        finally:
+            # Queries still waiting for a pool thread never reach Tavily; running ones still fill the cache
+            for search in searches:
+                search.cancel()
+        
+        if self.index:
+            if products:
+                self.index.add(products)
+            else:
+                # Tavily failed or found nothing: products found for this item before beat the generic fallback
+                for product in self.index.fallback(suggestion['item'], limit=self.PRODUCTS_PER_SUGGESTION):
+                    aggregator.add(index, suggestion['item'], {
+                        **product, "category": suggestion['category'], "suggestion_item": suggestion['item'], "priority": suggestion['priority']
+                    })
+    
     def _get_fallback_products(self, suggestions: List[Dict]) -> List[Dict]:
         """Provide fallback products when Tavily search fails"""
         fallback_products = []
@@ -109,15 +206,16 @@ class ProductSearchService:
     async def search_specific_product(self, product_name: str, category: str = "") -> List[Dict]:
         """Search for a specific product"""
         try:
+            # Enough fresh products indexed from earlier searches answer without Tavily
+            if self.index:
+                local_products = self.index.lookup(product_name, limit=5)
+                if local_products:
+                    return [self._local_product(product, category) for product in local_products]
+            
             # Simplified query
             query = f"{product_name} {category} buy online"
             
-            response = self.client.search(
-                query=query,
-                search_depth="basic",  # Changed from "advanced"
-                max_results=5,
-                # Removed include_domains restriction
-            )
+            response = await self._search(query, max_results=5)
             
             products = []
             for result in response.get('results', []):
@@ -135,6 +233,12 @@ class ProductSearchService:
                     }
                     products.append(product)
             
+            if self.index:
+                if products:
+                    self.index.add([{**product, "suggestion_item": product_name} for product in products])
+                else:
+                    products = [self._local_product(product, category) for product in self.index.fallback(product_name, limit=5)]
+            
             # Add fallback if no results
             if not products:
                 products.append({
@@ -159,3 +263,15 @@ class ProductSearchService:
                 "source": "fallback",
                 "store": "Amazon"
             }]
+    
+    def _local_product(self, product: Dict, category: str) -> Dict:
+        """An indexed product shaped like a search_specific_product result"""
+        
+        return {
+            "title": product['title'],
+            "url": product['url'],
+            "description": product['description'],
+            "category": category,
+            "source": product['source'],
+            "store": product['store']
+        }
@@ -0,0 +1,143 @@
+import config
+import copy
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+from services.frame_store import image_refs
+from services.state_backend import StateBackend, get_state_backend
+
+# Bump when a code change makes earlier detections stale
+RESULT_CACHE_VERSION = 1
+
+# Settings that change which frames are sampled or what the model is shown
+FINGERPRINT_SETTINGS = (
+    "FRAME_SAMPLE_COUNT", "FRAME_SAMPLING_MODE", "FRAME_SCENE_CANDIDATES", "FRAME_QUALITY_WINDOW_SECONDS",
+    "FRAME_QUALITY_CANDIDATES", "FRAME_MAX_EDGE", "FRAME_IMAGE_FORMAT", "FRAME_IMAGE_QUALITY",
+    "FRAME_KEEP_ORIGINAL", "FRAME_DEDUP_MAX_DISTANCE", "ITEM_CROP_MAX_EDGE", "ITEM_CROP_PADDING",
+    "VISION_BATCH_MODE", "VISION_MOSAIC_TILES", "VISION_MOSAIC_TILE_WIDTH"
+)
+
+# Job fields a cached result restores
+CACHED_FIELDS = ("frames", "items", "dedup_ratio", "vision_requests")
+
+class ExtractionResultCache:
+    """Results of completed extractions keyed by the SHA-256 of the uploaded video
+    
+    A re-upload of the same bytes (with the same extraction settings) gets the earlier
+    frames and items - already saved to Appwrite - instead of running the pipeline again.
+    Entries live in the shared state backend, so every worker sees them; an index of
+    sizes and last use evicts the least recently used entries over max_entries or
+    max_bytes. Entries whose images the frame store no longer has count as misses.
+    """
+    
+    NAMESPACE = "extraction_results"
+    INDEX_NAMESPACE = "extraction_results_index"
+    METRICS_NAMESPACE = "extraction_results_metrics"
+    
+    def __init__(self, frame_store, backend: StateBackend = None, max_entries: int = None,
+                 max_bytes: int = None, ttl: float = None):
+        self.frame_store = frame_store
+        self.state = backend or get_state_backend()
+        self.max_entries = max_entries or config.RESULT_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.RESULT_CACHE_MAX_BYTES
+        self.ttl = ttl or config.RESULT_CACHE_TTL_SECONDS
+    
+    def get(self, content_sha256: str) -> Optional[Dict]:
+        """Cached result for a video, or None; counts the lookup as a hit or miss"""
+        
+        key = self._key(content_sha256)
+        entry = self.state.get(self.NAMESPACE, key)
+        
+        if entry is not None and not all(ref in self.frame_store for ref in image_refs((entry.get("frames") or []) + (entry.get("items") or []))):
+            print(f"Dropping cached extraction result {key[:12]}: its images were pruned")
+            self._remove(key)
+            entry = None
+        
+        if entry is None:
+            self._count(misses=1)
+            return None
+        
+        self.state.update(self.INDEX_NAMESPACE, "entries", lambda index: self._touch(index, key), default={})
+        self._count(hits=1, saved_vision_requests=entry.get("vision_requests", 0))
+        return copy.deepcopy(entry)
+    
+    def put(self, content_sha256: str, job: Dict):
+        """Remember a completed job's result, evicting older entries to stay within the limits"""
+        
+        key = self._key(content_sha256)
+        # A copy, so later edits to the job (or its items) never reach the cached result
+        entry = copy.deepcopy({field: job.get(field) for field in CACHED_FIELDS})
+        entry["created_at"] = time.time()
+        
+        size = len(json.dumps(entry, default=str))
+        if size > self.max_bytes:
+            return
+        
+        self.state.set(self.NAMESPACE, key, entry, ttl=self.ttl)
+        
+        expired: List[str] = []
+        evicted: List[str] = []
+        
+        def admit(index: Dict) -> Dict:
+            now = time.time()
+            expired[:] = [k for k, v in index.items() if v["expires_at"] <= now]
+            index = {k: v for k, v in index.items() if v["expires_at"] > now}
+            index[key] = {"bytes": size, "used_at": now, "expires_at": now + self.ttl}
+            
+            # Least recently used first
+            while len(index) > self.max_entries or sum(v["bytes"] for v in index.values()) > self.max_bytes:
+                oldest = min(index, key=lambda k: index[k]["used_at"])
+                del index[oldest]
+                evicted.append(oldest)
+            return index
+        
+        self.state.update(self.INDEX_NAMESPACE, "entries", admit, default={})
+        # Expired values go with their index entries; the memory backend would otherwise keep them
+        for removed_key in expired + evicted:
+            self.state.delete(self.NAMESPACE, removed_key)
+        if evicted:
+            self._count(evictions=len(evicted))
+    
+    def record_forced(self):
+        """Count an upload that skipped the cache on request"""
+        self._count(forced=1)
+    
+    def metrics(self) -> Dict:
+        counters = self.state.get(self.METRICS_NAMESPACE, "counters") or {}
+        index = self.state.get(self.INDEX_NAMESPACE, "entries") or {}
+        hits = counters.get("hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        
+        return {
+            "hits": hits,
+            "misses": counters.get("misses", 0),
+            "forced": counters.get("forced", 0),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "saved_vision_requests": counters.get("saved_vision_requests", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": len(index),
+            "bytes": sum(v["bytes"] for v in index.values())
+        }
+    
+    def _key(self, content_sha256: str) -> str:
+        settings = json.dumps([RESULT_CACHE_VERSION] + [getattr(config, name) for name in FINGERPRINT_SETTINGS])
+        fingerprint = hashlib.blake2b(settings.encode(), digest_size=6).hexdigest()
+        return f"{content_sha256.lower()}:{fingerprint}"
+    
+    def _touch(self, index: Dict, key: str) -> Dict:
+        if key in index:
+            index[key]["used_at"] = time.time()
+        return index
+    
+    def _remove(self, key: str):
+        self.state.delete(self.NAMESPACE, key)
+        self.state.update(self.INDEX_NAMESPACE, "entries", lambda index: {k: v for k, v in index.items() if k != key}, default={})
+    
+    def _count(self, **increments):
+        def add(counters: Dict) -> Dict:
+            for name, amount in increments.items():
+                counters[name] = counters.get(name, 0) + amount
+            return counters
+        
+        self.state.update(self.METRICS_NAMESPACE, "counters", add, default={})
@@ -1,8 +1,12 @@
 import config  # This imports and loads environment variables
 from openai import OpenAI
+import asyncio
+import copy
+import hashlib
 import json
 import base64
 from typing import Dict
+from services.single_flight import SingleFlight
 
 class RoomAnalyzer:
     def __init__(self):
@@ -10,9 +14,17 @@ class RoomAnalyzer:
             base_url="https://api.studio.nebius.ai/v1/",
             api_key=config.NEBIUS_API_KEY
         )
+        # The same photo analyzed by several requests at once costs one model call
+        self.flights = SingleFlight()
     
     async def analyze_room_image(self, image_data: bytes) -> Dict:
         """Analyze room image and provide decoration suggestions using Nebius vision model"""
+        
+        analysis = await self.flights.do(hashlib.sha256(image_data).hexdigest(), lambda: self._analyze_room_image(image_data))
+        # Callers personalize the analysis in place, so each gets its own copy
+        return copy.deepcopy(analysis)
+    
+    async def _analyze_room_image(self, image_data: bytes) -> Dict:
         try:
             # Convert image to base64
             image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -39,7 +51,9 @@ class RoomAnalyzer:
             Focus on practical, achievable improvements that would make the space more comfortable and aesthetically pleasing.
             """
             
-            response = self.client.chat.completions.create(
+            # The client is synchronous; keep the event loop free while the model runs
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model="Qwen/Qwen2-VL-72B-Instruct",
                 max_tokens=1024,
                 temperature=0.7,
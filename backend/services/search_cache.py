@@ -0,0 +1,132 @@
+import config
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from services.state_backend import StateBackend, SQLiteStateBackend
+
+class SearchCache:
+    """TTL + LRU cache for upstream search results, with stale-while-revalidate
+    
+    Entries younger than ttl are returned as they are. Up to stale_seconds after that
+    they are still returned immediately, while one background refresh replaces them.
+    The most recently used max_entries stay in memory; with a persistent backend every
+    entry is also written there and read back after a restart or memory eviction.
+    """
+    
+    NAMESPACE = "search_cache"
+    
+    def __init__(self, ttl: float = None, stale_seconds: float = None, max_entries: int = None,
+                 backend: Optional[StateBackend] = None):
+        self.ttl = ttl if ttl is not None else config.SEARCH_CACHE_TTL_SECONDS
+        self.stale_seconds = stale_seconds if stale_seconds is not None else config.SEARCH_CACHE_STALE_SECONDS
+        self.max_entries = max_entries or config.SEARCH_CACHE_MAX_ENTRIES
+        self.backend = backend
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "evictions": 0}
+        # Mean seconds an upstream request takes, to estimate the latency hits save
+        self._mean_fetch_seconds = 0.0
+        self._fetches = 0
+        self._latency_saved = 0.0
+    
+    @staticmethod
+    def key(query: str, **params) -> str:
+        """Cache key for a query: case and whitespace are normalized, parameters sorted"""
+        
+        normalized = re.sub(r"\s+", " ", query.strip().lower())
+        return "|".join([normalized] + [f"{name}={params[name]}" for name in sorted(params)])
+    
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for key, calling fetch() on a miss; falsy results are not cached"""
+        
+        entry = self._lookup(key)
+        age = time.time() - entry["stored_at"] if entry else None
+        
+        if entry and age < self.ttl:
+            self._count_hit("hits")
+            return entry["value"]
+        
+        if entry and age < self.ttl + self.stale_seconds:
+            self._count_hit("stale_hits")
+            if key not in self._refreshing:
+                task = asyncio.create_task(self._refresh(key, fetch))
+                self._refreshing[key] = task
+                task.add_done_callback(lambda _, key=key: self._refreshing.pop(key, None))
+            return entry["value"]
+        
+        self._counters["misses"] += 1
+        return await self._fetch_and_store(key, fetch)
+    
+    def put(self, key: str, value: Any):
+        """Store a value fetched outside get_or_fetch, e.g. by a request that finished after its caller gave up"""
+        
+        if value:
+            self._store(key, {"value": value, "stored_at": time.time()})
+    
+    def metrics(self) -> Dict:
+        lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+        served = self._counters["hits"] + self._counters["stale_hits"]
+        
+        return {
+            **self._counters,
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+            # Stale hits still cost a (background) refresh, so only fresh hits save quota
+            "upstream_calls_saved": self._counters["hits"],
+            "latency_saved_seconds": round(self._latency_saved, 3),
+            "entries": len(self._entries),
+            "persistent": self.backend is not None
+        }
+    
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        self._counters["refreshes"] += 1
+        try:
+            await self._fetch_and_store(key, fetch)
+        except Exception as e:
+            print(f"Error refreshing cached search '{key}': {str(e)}")
+    
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        value = await fetch()
+        
+        self._fetches += 1
+        self._mean_fetch_seconds += (time.perf_counter() - started - self._mean_fetch_seconds) / self._fetches
+        
+        if value:
+            self._store(key, {"value": value, "stored_at": time.time()})
+        return value
+    
+    def _count_hit(self, counter: str):
+        self._counters[counter] += 1
+        self._latency_saved += self._mean_fetch_seconds
+    
+    def _lookup(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        
+        if self.backend is not None:
+            entry = self.backend.get(self.NAMESPACE, key)
+            if entry is not None:
+                self._remember(key, entry)
+        return entry
+    
+    def _store(self, key: str, entry: Dict):
+        self._remember(key, entry)
+        if self.backend is not None:
+            # The backend drops entries once they are too old to be served even stale
+            self.backend.set(self.NAMESPACE, key, entry, ttl=self.ttl + self.stale_seconds)
+    
+    def _remember(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+def create_search_cache() -> SearchCache:
+    """Search cache for the configured SEARCH_CACHE_* settings"""
+    
+    return SearchCache(backend=SQLiteStateBackend(config.SEARCH_CACHE_DB_PATH) if config.SEARCH_CACHE_PERSIST else None)
@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one upstream call
+    
+    While a call for a key is in flight, later callers with the same key wait for it and
+    get the same result (or exception) instead of starting their own. The call is only
+    cancelled when every caller waiting for it has been cancelled. Results are shared,
+    so callers that modify them must copy them first.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, Dict] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Stable key for arbitrary JSON-serializable call arguments"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = {"task": asyncio.ensure_future(call()), "waiters": 0}
+            self._flights[key] = flight
+            flight["task"].add_done_callback(lambda _, key=key, flight=flight: self._land(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        
+        flight["waiters"] += 1
+        try:
+            # Shielded so one caller's cancellation doesn't cancel the call the others wait for
+            return await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            if flight["waiters"] == 1:
+                # Nobody wants the result any more; new callers must not join a call being cancelled
+                flight["task"].cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight["waiters"] -= 1
+    
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+    
+    def _land(self, key: str, flight: Dict):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve the outcome so an exception nobody awaited isn't reported as unhandled
+        if not flight["task"].cancelled():
+            flight["task"].exception()
@@ -0,0 +1,282 @@
+import config
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+# Identifies this process when it holds a lease; unique across workers and restarts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class StateBackend(ABC):
+    """Small key-value interface for state shared by all uvicorn workers
+    
+    Values are JSON-serializable and grouped by namespace. update() must be atomic
+    and the lease methods must behave like SET NX with an expiry, so a Redis-like
+    store can implement this as well as SQLite does.
+    """
+    
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        pass
+    
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: float = None):
+        pass
+    
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        pass
+    
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        pass
+    
+    @abstractmethod
+    def update(self, namespace: str, key: str, func: Callable[[Any], Any], default: Any = None, ttl: float = None) -> Any:
+        """Atomically replace a value with func(current value or default); returns the new value"""
+        pass
+    
+    @abstractmethod
+    def claim(self, name: str, owner: str, lease_seconds: float) -> bool:
+        """Take a lease if it is free, expired or already ours"""
+        pass
+    
+    @abstractmethod
+    def renew(self, name: str, owner: str, lease_seconds: float) -> bool:
+        """Extend a lease we hold; False if it was lost"""
+        pass
+    
+    @abstractmethod
+    def release(self, name: str, owner: str):
+        pass
+    
+    @abstractmethod
+    def stats(self, namespace: str) -> Dict:
+        pass
+
+class MemoryStateBackend(StateBackend):
+    """Process-local state; only correct with a single worker"""
+    
+    # Seconds between sweeps for expired values
+    PURGE_INTERVAL = 60
+    
+    def __init__(self):
+        self._values: Dict[str, Dict[str, tuple]] = {}
+        self._leases: Dict[str, tuple] = {}
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value, expires_at = self._values.get(namespace, {}).get(key, (None, None))
+        if expires_at is not None and expires_at < time.time():
+            self.delete(namespace, key)
+            return None
+        return value
+    
+    def set(self, namespace: str, key: str, value: Any, ttl: float = None):
+        now = time.time()
+        with self._lock:
+            self._values.setdefault(namespace, {})[key] = (value, now + ttl if ttl else None)
+        
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._purge()
+    
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._values.get(namespace, {}).pop(key, None)
+    
+    def keys(self, namespace: str) -> List[str]:
+        return [key for key in list(self._values.get(namespace, {})) if self.get(namespace, key) is not None]
+    
+    def update(self, namespace: str, key: str, func: Callable[[Any], Any], default: Any = None, ttl: float = None) -> Any:
+        now = time.time()
+        with self._lock:
+            current, expires_at = self._values.get(namespace, {}).get(key, (None, None))
+            if current is None or (expires_at is not None and expires_at < now):
+                current = default
+            value = func(current)
+            self._values.setdefault(namespace, {})[key] = (value, now + ttl if ttl else None)
+        
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._purge()
+        return value
+    
+    def claim(self, name: str, owner: str, lease_seconds: float) -> bool:
+        with self._lock:
+            holder, expires_at = self._leases.get(name, (None, 0))
+            if holder not in (None, owner) and expires_at > time.time():
+                return False
+            self._leases[name] = (owner, time.time() + lease_seconds)
+            return True
+    
+    def renew(self, name: str, owner: str, lease_seconds: float) -> bool:
+        with self._lock:
+            holder, _ = self._leases.get(name, (None, 0))
+            if holder != owner:
+                return False
+            self._leases[name] = (owner, time.time() + lease_seconds)
+            return True
+    
+    def release(self, name: str, owner: str):
+        with self._lock:
+            if self._leases.get(name, (None, 0))[0] == owner:
+                del self._leases[name]
+    
+    def stats(self, namespace: str) -> Dict:
+        values = self._values.get(namespace, {})
+        return {"keys": len(values), "bytes": sum(len(json.dumps(value, default=str)) for value, _ in values.values())}
+    
+    def _purge(self):
+        """Delete expired values and leases; get() alone only drops the ones it is asked for"""
+        
+        self._last_purge = time.time()
+        with self._lock:
+            for values in self._values.values():
+                for key in [key for key, (_, expires_at) in values.items() if expires_at is not None and expires_at < self._last_purge]:
+                    del values[key]
+            for name in [name for name, (_, expires_at) in self._leases.items() if expires_at < self._last_purge]:
+                del self._leases[name]
+
+class SQLiteStateBackend(StateBackend):
+    """State in a SQLite file in WAL mode, shared by every worker on the node"""
+    
+    # Seconds between sweeps for expired values
+    PURGE_INTERVAL = 60
+    
+    def __init__(self, path: str = None):
+        self.path = path or config.STATE_DB_PATH
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Autocommit; transactions are opened explicitly where reads and writes must be atomic
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS state (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS state_expires ON state (expires_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def set(self, namespace: str, key: str, value: Any, ttl: float = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str), now + ttl if ttl else None)
+            )
+        
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._purge()
+    
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+    
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (namespace, time.time())
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def update(self, namespace: str, key: str, func: Callable[[Any], Any], default: Any = None, ttl: float = None) -> Any:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so no other worker can change the row in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                    (namespace, key, now)
+                ).fetchone()
+                value = func(json.loads(row[0]) if row else default)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, default=str), now + ttl if ttl else None)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+    
+    def claim(self, name: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            # Insert, or take over a lease that expired or is already ours - one statement, so it is atomic
+            cursor = self._conn.execute(
+                """INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                   WHERE leases.expires_at < ? OR leases.owner = excluded.owner""",
+                (name, owner, now + lease_seconds, now)
+            )
+        return cursor.rowcount > 0
+    
+    def renew(self, name: str, owner: str, lease_seconds: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?",
+                (time.time() + lease_seconds, name, owner)
+            )
+        return cursor.rowcount > 0
+    
+    def release(self, name: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+    
+    def stats(self, namespace: str) -> Dict:
+        with self._lock:
+            keys, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM state WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return {"keys": keys, "bytes": total_bytes}
+    
+    def _purge(self):
+        """Delete expired values and leases"""
+        
+        self._last_purge = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE expires_at < ?", (self._last_purge,))
+            self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (self._last_purge,))
+
+_state_backend: Optional[StateBackend] = None
+
+def get_state_backend() -> StateBackend:
+    """Process-wide backend for the configured STATE_BACKEND"""
+    
+    global _state_backend
+    if _state_backend is None:
+        _state_backend = SQLiteStateBackend() if config.STATE_BACKEND == "sqlite" else MemoryStateBackend()
+    return _state_backend
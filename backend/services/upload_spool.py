@@ -0,0 +1,239 @@
+import config
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+import aiofiles
+from fastapi import UploadFile
+from typing import AsyncIterator, Dict, Tuple
+
+def new_spool_path(filename: str = None) -> str:
+    """Unique path in the spool directory, keeping a safe video extension from the filename"""
+    
+    os.makedirs(config.UPLOAD_SPOOL_DIR, exist_ok=True)
+    
+    extension = os.path.splitext(filename or "")[1]
+    if not re.fullmatch(r"\.[A-Za-z0-9]{1,5}", extension):
+        extension = ".mp4"
+    
+    return os.path.join(config.UPLOAD_SPOOL_DIR, f"{uuid.uuid4().hex}{extension}")
+
+async def spool_upload(file: UploadFile, max_bytes: int = None) -> Tuple[str, str]:
+    """Copy an upload to a spool file chunk by chunk so it is never held in memory whole
+    
+    Returns the spool path and the SHA-256 of the content, hashed as it streams through.
+    Raises ValueError (and removes the partial file) when the upload exceeds max_bytes.
+    """
+    
+    if max_bytes is None:
+        max_bytes = config.MAX_VIDEO_UPLOAD_BYTES
+    
+    path = new_spool_path(file.filename)
+    digest = hashlib.sha256()
+    written = 0
+    
+    try:
+        async with aiofiles.open(path, 'wb') as spool_file:
+            while True:
+                chunk = await file.read(config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError(f"File size must be less than {max_bytes // (1024 * 1024)}MB")
+                
+                digest.update(chunk)
+                await spool_file.write(chunk)
+    except BaseException:
+        remove_spool_file(path)
+        raise
+    
+    return path, digest.hexdigest()
+
+def remove_spool_file(path: str):
+    """Delete a spooled upload, ignoring files that are already gone"""
+    
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error removing spooled upload {path}: {str(e)}")
+
+class ResumableUploads:
+    """Chunked upload sessions (init -> PUT chunks at offsets -> finalize) backed by spool files
+    
+    Each session is a `<id>.part` file plus a `<id>.json` sidecar in the spool directory. The
+    part file's size is the authoritative offset, so a client that lost its connection (or a
+    restarted server) resumes from whatever actually reached the disk.
+    """
+    
+    def __init__(self):
+        self.locks: Dict[str, asyncio.Lock] = {}
+    
+    def _paths(self, upload_id: str) -> Tuple[str, str]:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            raise KeyError(upload_id)
+        base = os.path.join(config.UPLOAD_SPOOL_DIR, upload_id)
+        return f"{base}.part", f"{base}.json"
+    
+    def _load(self, upload_id: str) -> Dict:
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as meta_file:
+                session = json.load(meta_file)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+        
+        session["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        return session
+    
+    def create(self, filename: str, size: int, content_type: str, sha256: str = None) -> Dict:
+        """Start a session for a file of the declared size"""
+        
+        if size <= 0 or size > config.MAX_VIDEO_UPLOAD_BYTES:
+            raise ValueError(f"File size must be between 1 byte and {config.MAX_VIDEO_UPLOAD_BYTES // (1024 * 1024)}MB")
+        
+        self.cleanup_expired()
+        os.makedirs(config.UPLOAD_SPOOL_DIR, exist_ok=True)
+        
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "content_type": content_type,
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": time.time()
+        }
+        
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w') as meta_file:
+            json.dump(session, meta_file)
+        
+        session["offset"] = 0
+        return session
+    
+    def status(self, upload_id: str) -> Dict:
+        """Current session state, including the offset the next chunk must start at"""
+        return self._load(upload_id)
+    
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict:
+        """Append a chunk that starts at `offset`
+        
+        Raises KeyError for unknown sessions, ValueError for bodies that overrun the declared
+        size, and OffsetMismatch when the offset is not where the file currently ends.
+        """
+        
+        lock = self.locks.setdefault(upload_id, asyncio.Lock())
+        
+        async with lock:
+            session = self._load(upload_id)
+            if offset != session["offset"]:
+                raise OffsetMismatch(session["offset"])
+            
+            part_path, _ = self._paths(upload_id)
+            written = session["offset"]
+            
+            # Whatever arrives before a disconnect stays on disk and becomes the resume offset
+            async with aiofiles.open(part_path, 'ab') as part_file:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if written + len(chunk) > session["size"]:
+                        raise ValueError("Chunk runs past the declared file size")
+                    await part_file.write(chunk)
+                    written += len(chunk)
+            
+            session["offset"] = written
+            return session
+    
+    async def finalize(self, upload_id: str, sha256: str = None) -> Tuple[str, Dict]:
+        """Verify size and checksum, then move the file into the spool as a regular upload
+        
+        Returns (spool path, session). The session is removed; the caller owns the file.
+        """
+        
+        lock = self.locks.setdefault(upload_id, asyncio.Lock())
+        
+        async with lock:
+            session = self._load(upload_id)
+            expected = (sha256 or session.get("sha256") or "").lower()
+            
+            if not expected:
+                raise ValueError("sha256 checksum is required to finalize an upload")
+            if session["offset"] != session["size"]:
+                raise ValueError(f"Upload incomplete: {session['offset']} of {session['size']} bytes received")
+            
+            part_path, meta_path = self._paths(upload_id)
+            actual = await asyncio.to_thread(file_sha256, part_path)
+            if actual != expected:
+                # The stored bytes are corrupt; there is nothing to resume from
+                remove_spool_file(part_path)
+                remove_spool_file(meta_path)
+                self.locks.pop(upload_id, None)
+                raise ValueError("Checksum mismatch; start a new upload")
+            
+            path = new_spool_path(session["filename"])
+            os.replace(part_path, path)
+            remove_spool_file(meta_path)
+        
+        self.locks.pop(upload_id, None)
+        session["sha256"] = actual
+        return path, session
+    
+    def abort(self, upload_id: str):
+        """Drop a session and its partial data"""
+        
+        part_path, meta_path = self._paths(upload_id)
+        if not os.path.exists(meta_path):
+            raise KeyError(upload_id)
+        
+        remove_spool_file(part_path)
+        remove_spool_file(meta_path)
+        self.locks.pop(upload_id, None)
+    
+    def cleanup_expired(self):
+        """Remove sessions that have not been finalized within UPLOAD_SESSION_TTL"""
+        
+        if not os.path.isdir(config.UPLOAD_SPOOL_DIR):
+            return
+        
+        cutoff = time.time() - config.UPLOAD_SESSION_TTL
+        for name in os.listdir(config.UPLOAD_SPOOL_DIR):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            meta_path = os.path.join(config.UPLOAD_SPOOL_DIR, name)
+            part_path = os.path.join(config.UPLOAD_SPOOL_DIR, f"{upload_id}.part")
+            try:
+                # Appending chunks touches the part file, so active sessions are never expired
+                last_activity = max(
+                    os.path.getmtime(meta_path),
+                    os.path.getmtime(part_path) if os.path.exists(part_path) else 0
+                )
+                if last_activity < cutoff:
+                    self.abort(upload_id)
+            except Exception as e:
+                print(f"Error cleaning up upload session {name}: {str(e)}")
+
+class OffsetMismatch(Exception):
+    """A chunk did not start where the partial upload currently ends"""
+    
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Chunk offset does not match; resume from byte {expected_offset}")
+        self.expected_offset = expected_offset
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in UPLOAD_CHUNK_SIZE pieces"""
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(config.UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,20 +1,37 @@
 import config
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
 import base64
 import json
-from typing import List, Dict
-import tempfile
-import os
+from typing import List, Dict, Tuple, Iterator, Optional
 import cv2
 import numpy as np
+from services.frame_analysis import (
+    frame_signature, select_distinct_frames, perceptual_hash, hamming_distance, frame_quality, quality_rank,
+    tile_frames, encode_frame, parse_bbox, crop_to_bbox
+)
+from services.decode_pool import DecodePool
+from services.frame_store import FrameStore
+
+# Longest gap (in seconds) decoded through with grab() instead of seeking; roughly one GOP on phone video
+SEEK_KEYFRAME_WINDOW_SECONDS = 2.0
 
 class VideoProcessor:
     def __init__(self):
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             base_url="https://api.studio.nebius.ai/v1/",
             api_key=config.NEBIUS_API_KEY
         )
         
+        # Caps in-flight vision requests across all jobs sharing this processor
+        self.vision_semaphore = asyncio.Semaphore(config.VISION_MAX_CONCURRENCY)
+        
+        # OpenCV decode/encode runs here so it never blocks the event loop
+        self.decode_pool = DecodePool()
+        
+        # Job frames and items reference images here by content hash instead of embedding base64
+        self.frame_store = FrameStore()
+        
         # Common sellable household items for suggestions
         self.sellable_categories = {
             'furniture': ['chair', 'table', 'sofa', 'bed', 'desk', 'bookshelf', 'dresser', 'cabinet'],
@@ -26,21 +43,18 @@ class VideoProcessor:
             'clothing': ['jacket', 'shoes', 'bag', 'backpack']
         }
     
-    async def extract_frames(self, video_data: bytes) -> List[Dict]:
-        """Extract actual frames from video using OpenCV"""
+    def iter_frames(self, video_path: str, sampling_mode: str = None) -> Iterator[Dict]:
+        """Yield extracted frames one at a time, as soon as each is decoded and encoded"""
+        
+        sampling_mode = sampling_mode or config.FRAME_SAMPLING_MODE
+        
+        # Open video with OpenCV
+        cap = cv2.VideoCapture(video_path)
+        
+        if not cap.isOpened():
+            raise Exception("Could not open video file")
         
         try:
-            # Save video data to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-                temp_file.write(video_data)
-                temp_video_path = temp_file.name
-            
-            # Open video with OpenCV
-            cap = cv2.VideoCapture(temp_video_path)
-            
-            if not cap.isOpened():
-                raise Exception("Could not open video file")
-            
             # Get video properties
             fps = cap.get(cv2.CAP_PROP_FPS)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -48,89 +62,404 @@ class VideoProcessor:
             
             print(f"Video info: {fps} FPS, {total_frames} frames, {duration:.2f}s duration")
             
-            frames = []
-            frame_interval = max(1, int(fps * 2))  # Extract frame every 2 seconds
+            # Seeking needs a known frame count; streams without one are read sequentially
+            if sampling_mode == "scene" and fps > 0 and total_frames > 0:
+                sampled = self._sample_by_scene_change(cap, fps, total_frames)
+            elif sampling_mode == "seek" and fps > 0 and total_frames > 0:
+                sampled = self._sample_by_seeking(cap, fps, total_frames)
+            else:
+                sampled = self._sample_sequentially(cap, fps)
             
-            frame_count = 0
-            extracted_count = 0
+            for index, (frame_number, frame) in enumerate(sampled):
+                # Encode once with the configured profile; this copy is sent to the VLM and returned to clients
+                frame_base64, mime_type = encode_frame(
+                    frame, config.FRAME_MAX_EDGE, config.FRAME_IMAGE_FORMAT, config.FRAME_IMAGE_QUALITY
+                )
+                
+                timestamp = frame_number / fps if fps > 0 else index * 2
+                
+                frame_info = {
+                    'id': f"frame_{index}",
+                    'timestamp': timestamp,
+                    'frame_data': frame_base64,
+                    'mime_type': mime_type,
+                    'frame_number': frame_number,
+                    'phash': perceptual_hash(frame),
+                    'quality': frame_quality(frame),
+                    'items': []
+                }
+                
+                # Full-resolution copy only when listing photos should use it
+                if config.FRAME_KEEP_ORIGINAL:
+                    frame_info['original_frame_data'], _ = encode_frame(frame, 0, "jpeg", 95)
+                
+                print(f"Extracted frame {index + 1} at {timestamp:.1f}s ({len(frame_base64) // 1024} KB)")
+                yield frame_info
+                
+        finally:
+            cap.release()
+    
+    def _sample_sequentially(self, cap, fps: float) -> Iterator[Tuple[int, np.ndarray]]:
+        """Decode every frame from the start and keep one every 2 seconds
+        
+        Frames are scored in the same quality window as _read_best_near(), but the
+        window is scanned as it streams past since this mode cannot seek.
+        """
+        
+        frame_interval = max(1, int(fps * 2))  # Extract frame every 2 seconds
+        
+        # Windows must not overlap, or a frame could belong to two scheduled frames
+        half_window = min(int(fps * config.FRAME_QUALITY_WINDOW_SECONDS / 2), (frame_interval - 1) // 2)
+        count = config.FRAME_QUALITY_CANDIDATES
+        if half_window < 1 or count < 2:
+            offsets = [0]
+        else:
+            offsets = sorted({-half_window + round(i * 2 * half_window / (count - 1)) for i in range(count)})
+        
+        frame_count = 0
+        extracted_count = 0
+        best = None
+        
+        while cap.isOpened() and extracted_count < config.FRAME_SAMPLE_COUNT:
+            ret, frame = cap.read()
+            if not ret:
+                break
             
-            while cap.isOpened() and extracted_count < 5:  # Limit to 5 frames
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            # Scheduled frame whose window this frame falls in, if any
+            target = (frame_count + half_window) // frame_interval * frame_interval
+            offset = frame_count - target
+            
+            if offset in offsets:
+                # Ties go to the frame closest to the scheduled one
+                rank = quality_rank(frame_quality(frame)) + (-abs(offset),)
+                if best is None or rank > best[2]:
+                    best = (frame_count, frame, rank)
+            
+            if best is not None and offset >= offsets[-1]:
+                if best[0] != target:
+                    print(f"Substituted frame {best[0]} for {target} (sharpness {best[2][1]})")
+                extracted_count += 1
+                yield best[0], best[1]
+                best = None
+            
+            frame_count += 1
+        
+        # The stream ended inside a window; keep the best frame seen in it
+        if best is not None and extracted_count < config.FRAME_SAMPLE_COUNT:
+            yield best[0], best[1]
+    
+    def _sample_by_seeking(self, cap, fps: float, total_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Jump straight to evenly spaced frames across the whole clip"""
+        
+        targets = self._spread_targets(total_frames, config.FRAME_SAMPLE_COUNT)
+        return self._read_best_near(cap, fps, total_frames, targets)
+    
+    def _sample_by_scene_change(self, cap, fps: float, total_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Scan candidate frames across the clip and keep the most visually distinct ones"""
+        
+        candidates = self._spread_targets(total_frames, config.FRAME_SCENE_CANDIDATES)
+        
+        # Only the small signatures are kept while scanning; the chosen frames are decoded again
+        frame_numbers = []
+        signatures = []
+        for frame_number, frame in self._iter_frames_at(cap, fps, candidates):
+            frame_numbers.append(frame_number)
+            signatures.append(frame_signature(frame))
+        
+        if not signatures:
+            return iter([])
+        
+        picks = select_distinct_frames(np.stack(signatures), config.FRAME_SAMPLE_COUNT)
+        targets = sorted(frame_numbers[i] for i in picks)
+        print(f"Scene selection kept frames {targets} out of {len(frame_numbers)} candidates")
+        
+        return self._read_best_near(cap, fps, total_frames, targets)
+    
+    def _read_best_near(self, cap, fps: float, total_frames: int, targets: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Read each target, substituting the best exposed, sharpest frame within a small window"""
+        
+        half_window = int(fps * config.FRAME_QUALITY_WINDOW_SECONDS / 2)
+        count = config.FRAME_QUALITY_CANDIDATES
+        
+        if half_window < 1 or count < 2:
+            yield from self._iter_frames_at(cap, fps, targets)
+            return
+        
+        for target in targets:
+            neighbours = sorted({
+                min(total_frames - 1, max(0, target - half_window + round(i * 2 * half_window / (count - 1))))
+                for i in range(count)
+            })
+            
+            best = None
+            for frame_number, frame in self._iter_frames_at(cap, fps, neighbours):
+                # Ties go to the frame closest to the scheduled one
+                rank = quality_rank(frame_quality(frame)) + (-abs(frame_number - target),)
+                if best is None or rank > best[2]:
+                    best = (frame_number, frame, rank)
+            
+            if best is None:
+                continue
+            
+            if best[0] != target:
+                print(f"Substituted frame {best[0]} for {target} (sharpness {best[2][1]})")
+            yield best[0], best[1]
+    
+    def _spread_targets(self, total_frames: int, count: int) -> List[int]:
+        """Frame numbers at the centre of `count` equal segments of the clip"""
+        
+        count = min(count, total_frames)
+        # Segment centres, so the first and last seconds are not oversampled
+        return sorted({int((i + 0.5) * total_frames / count) for i in range(count)})
+    
+    def _iter_frames_at(self, cap, fps: float, targets: List[int]):
+        """Yield (frame_number, frame) for each target, seeking instead of decoding every frame"""
+        
+        # Gaps shorter than this are cheaper to grab() through than to seek across
+        keyframe_window = max(1, int(fps * SEEK_KEYFRAME_WINDOW_SECONDS))
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        
+        for target in targets:
+            frame = None
+            
+            if target - position > keyframe_window:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+                if position == target:
+                    ret, frame = cap.read()
+                    position += 1
+                    if not ret:
+                        frame = None
+            
+            if frame is None:
+                # Keyframe-aware fallback: some codecs seek inaccurately (or not at all), so
+                # rewind to a point a keyframe interval before the target and grab forward
+                if position > target or target - position > keyframe_window:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, target - keyframe_window))
+                    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+                    if position > target:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        position = 0
                 
-                # Extract frame at intervals
-                if frame_count % frame_interval == 0:
-                    # Convert frame to JPEG
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                    
-                    timestamp = frame_count / fps if fps > 0 else extracted_count * 2
-                    
-                    frames.append({
-                        'id': f"frame_{extracted_count}",
-                        'timestamp': timestamp,
-                        'frame_data': frame_base64,
-                        'frame_number': frame_count,
-                        'items': []
-                    })
-                    
-                    extracted_count += 1
-                    print(f"Extracted frame {extracted_count} at {timestamp:.1f}s")
+                while position < target and cap.grab():
+                    position += 1
                 
-                frame_count += 1
+                ret, frame = cap.read()
+                position += 1
+                if not ret:
+                    print(f"Could not decode frame {target}, skipping")
+                    continue
             
-            cap.release()
+            yield target, frame
+    
+    def store_frame(self, frame_info: Dict) -> Dict:
+        """Move a frame's images into the frame store, returning a copy that references them by hash"""
+        
+        stored = {key: value for key, value in frame_info.items() if key not in ('frame_data', 'original_frame_data')}
+        stored['frame_ref'] = self.frame_store.put(frame_info['frame_data'], frame_info.get('mime_type', 'image/jpeg'))
+        if frame_info.get('original_frame_data'):
+            stored['original_frame_ref'] = self.frame_store.put(frame_info['original_frame_data'], "image/jpeg")
+        
+        return stored
+    
+    def resolve_image(self, entry: Dict, prefer_original: bool = False) -> str:
+        """Base64 image for a stored frame or item, or '' when it has none (e.g. manual items)"""
+        
+        ref = (prefer_original and entry.get('original_frame_ref')) or entry.get('frame_ref')
+        return self.frame_store.get_base64(ref) if ref else ''
+    
+    def resolve_mime_type(self, entry: Dict, prefer_original: bool = False) -> str:
+        """Mime type of the image resolve_image returns"""
+        
+        ref = (prefer_original and entry.get('original_frame_ref')) or entry.get('frame_ref')
+        return self.frame_store.mime_type(ref) if ref else "image/jpeg"
+    
+    def find_duplicate_frame(self, frame_info: Dict, kept_frames: List[Dict], max_distance: int = None) -> Optional[Dict]:
+        """Return the first kept frame whose perceptual hash is within max_distance bits, if any"""
+        
+        if max_distance is None:
+            max_distance = config.FRAME_DEDUP_MAX_DISTANCE
+        
+        if not frame_info.get('phash'):
+            return None
+        
+        return next(
+            (kept for kept in kept_frames
+             if kept.get('phash') and hamming_distance(kept['phash'], frame_info['phash']) <= max_distance),
+            None
+        )
+    
+    async def detect_objects(self, frames: List[Dict], batch_mode: str = None) -> List[Dict]:
+        """Detect objects in video frames using Nebius vision model"""
+        
+        batch_mode = batch_mode or config.VISION_BATCH_MODE
+        
+        # Requests run concurrently (bounded by self.vision_semaphore) and are merged back in frame order
+        if batch_mode == "mosaic":
+            tiles = max(1, config.VISION_MOSAIC_TILES)
+            chunks = [frames[i:i + tiles] for i in range(0, len(frames), tiles)]
+            results = await asyncio.gather(*(self._detect_mosaic_objects(chunk) for chunk in chunks))
+        else:
+            results = await asyncio.gather(*(self._detect_frame_objects(frame_info) for frame_info in frames))
+        
+        detected_objects = [obj for request_objects in results for obj in request_objects]
+        
+        print(f"Detected {len(detected_objects)} objects across all frames ({batch_mode} mode, {len(results)} requests)")
+        return detected_objects
+    
+    async def _detect_frame_objects(self, frame_info: Dict) -> List[Dict]:
+        """Run the vision model on a single frame"""
+        
+        try:
+            prompt = """
+            Analyze this video frame and identify sellable household items that could be sold on a marketplace.
             
-            # Clean up temporary file
-            try:
-                os.unlink(temp_video_path)
-            except:
-                pass
+            Look for items like:
+            - Furniture (chairs, tables, sofas, beds, desks, bookshelves)
+            - Electronics (TVs, laptops, monitors, speakers, phones, tablets)
+            - Appliances (microwaves, toasters, blenders, coffee makers)
+            - Decor items (lamps, mirrors, picture frames, vases, clocks)
+            - Sports equipment (bicycles, exercise equipment)
+            - Books and magazines
+            - Clothing and accessories (jackets, shoes, bags)
             
-            print(f"Extracted {len(frames)} frames from video")
-            return frames
+            Return a JSON array of detected sellable items:
+            [
+                {
+                    "object_name": "specific item name",
+                    "category": "furniture/electronics/appliances/decor/sports/books/clothing",
+                    "confidence": 0.85,
+                    "condition": "excellent/good/fair/poor",
+                    "estimated_value": 50,
+                    "description": "brief description of the item",
+                    "bbox": [x_min, y_min, x_max, y_max]
+                }
+            ]
             
+            "bbox" is the item's bounding box in this frame, as integers from 0 to 1000 relative to the image width and height.
+            Only include items that would realistically be sellable on Facebook Marketplace or similar platforms.
+            Be specific with item names (e.g., "office chair" not just "chair").
+            Estimate realistic prices in USD.
+            """
+            
+            ai_response = await self._call_vision_model(prompt, frame_info['frame_data'], frame_info.get('mime_type', 'image/jpeg'))
+            print(f"AI response for frame {frame_info['id']}: {ai_response[:200]}...")
+            
+            detected_objects = self._parse_detection_response(ai_response, frame_info)
+            return await self.decode_pool.run(self.crop_objects, detected_objects)
+            
+        except asyncio.TimeoutError:
+            print(f"Timed out detecting objects in frame {frame_info['id']} after {config.VISION_FRAME_TIMEOUT}s")
+            return []
         except Exception as e:
-            raise Exception(f"Error extracting frames: {str(e)}")
+            print(f"Error detecting objects in frame {frame_info['id']}: {str(e)}")
+            return []
     
-    async def detect_objects(self, frames: List[Dict]) -> List[Dict]:
-        """Detect objects in video frames using Nebius vision model"""
+    async def _detect_mosaic_objects(self, frames: List[Dict]) -> List[Dict]:
+        """Run the vision model once on a labeled grid of several frames"""
         
-        detected_objects = []
+        frame_ids = ", ".join(frame_info['id'] for frame_info in frames)
         
-        for frame_info in frames:
+        try:
+            prompt = f"""
+            This image is a grid of {len(frames)} video frames from the same room walkthrough.
+            Each tile is labeled with its tile number (0 to {len(frames) - 1}) in its top-left corner.
+            
+            Identify sellable household items that could be sold on a marketplace in any of the tiles.
+            
+            Look for items like:
+            - Furniture (chairs, tables, sofas, beds, desks, bookshelves)
+            - Electronics (TVs, laptops, monitors, speakers, phones, tablets)
+            - Appliances (microwaves, toasters, blenders, coffee makers)
+            - Decor items (lamps, mirrors, picture frames, vases, clocks)
+            - Sports equipment (bicycles, exercise equipment)
+            - Books and magazines
+            - Clothing and accessories (jackets, shoes, bags)
+            
+            Return a JSON array of detected sellable items, attributing each item to the tile it is best seen in:
+            [
+                {{
+                    "tile": 0,
+                    "object_name": "specific item name",
+                    "category": "furniture/electronics/appliances/decor/sports/books/clothing",
+                    "confidence": 0.85,
+                    "condition": "excellent/good/fair/poor",
+                    "estimated_value": 50,
+                    "description": "brief description of the item",
+                    "bbox": [x_min, y_min, x_max, y_max]
+                }}
+            ]
+            
+            "bbox" is the item's bounding box within its tile, as integers from 0 to 1000 relative to that tile's width and height.
+            List an item once even if it appears in several tiles.
+            Only include items that would realistically be sellable on Facebook Marketplace or similar platforms.
+            Be specific with item names (e.g., "office chair" not just "chair").
+            Estimate realistic prices in USD.
+            """
+            
+            mosaic_data, mime_type = await self.decode_pool.run(self._build_mosaic, frames)
+            ai_response = await self._call_vision_model(prompt, mosaic_data, mime_type)
+            print(f"AI response for mosaic of {frame_ids}: {ai_response[:200]}...")
+            
+            detected_objects = self._parse_detection_response(ai_response, frames[0], tile_frames=frames)
+            return await self.decode_pool.run(self.crop_objects, detected_objects)
+            
+        except asyncio.TimeoutError:
+            print(f"Timed out detecting objects in mosaic of {frame_ids} after {config.VISION_FRAME_TIMEOUT}s")
+            return []
+        except Exception as e:
+            print(f"Error detecting objects in mosaic of {frame_ids}: {str(e)}")
+            return []
+    
+    def crop_objects(self, detected_objects: List[Dict]) -> List[Dict]:
+        """Replace each object's full-frame image with a padded, resized crop of its bounding box
+        
+        Objects without a usable bbox keep the full frame. Each source frame is decoded once.
+        """
+        
+        decoded_frames = {}
+        
+        for obj in detected_objects:
+            if not obj.get('bbox'):
+                continue
+            
             try:
-                prompt = """
-                Analyze this video frame and identify sellable household items that could be sold on a marketplace.
+                # Crop from the full-resolution copy when there is one
+                if obj['frame_id'] not in decoded_frames:
+                    source = obj.get('original_frame_data') or obj['frame_data']
+                    decoded_frames[obj['frame_id']] = cv2.imdecode(np.frombuffer(base64.b64decode(source), np.uint8), cv2.IMREAD_COLOR)
+                frame = decoded_frames[obj['frame_id']]
                 
-                Look for items like:
-                - Furniture (chairs, tables, sofas, beds, desks, bookshelves)
-                - Electronics (TVs, laptops, monitors, speakers, phones, tablets)
-                - Appliances (microwaves, toasters, blenders, coffee makers)
-                - Decor items (lamps, mirrors, picture frames, vases, clocks)
-                - Sports equipment (bicycles, exercise equipment)
-                - Books and magazines
-                - Clothing and accessories (jackets, shoes, bags)
-                
-                Return a JSON array of detected sellable items:
-                [
-                    {
-                        "object_name": "specific item name",
-                        "category": "furniture/electronics/appliances/decor/sports/books/clothing",
-                        "confidence": 0.85,
-                        "condition": "excellent/good/fair/poor",
-                        "estimated_value": 50,
-                        "description": "brief description of the item"
-                    }
-                ]
-                
-                Only include items that would realistically be sellable on Facebook Marketplace or similar platforms.
-                Be specific with item names (e.g., "office chair" not just "chair").
-                Estimate realistic prices in USD.
-                """
+                crop = crop_to_bbox(frame, obj['bbox'], config.ITEM_CROP_PADDING)
+                obj['frame_data'], obj['mime_type'] = encode_frame(
+                    crop, config.ITEM_CROP_MAX_EDGE, config.FRAME_IMAGE_FORMAT, config.FRAME_IMAGE_QUALITY
+                )
+                if obj.get('original_frame_data'):
+                    obj['original_frame_data'], _ = encode_frame(crop, 0, "jpeg", 95)
+                obj['bbox'] = [round(coord, 4) for coord in obj['bbox']]
                 
-                response = self.client.chat.completions.create(
+            except Exception as e:
+                print(f"Error cropping '{obj['object_name']}' from frame {obj['frame_id']}: {str(e)}")
+                obj['bbox'] = None
+        
+        return detected_objects
+    
+    def _build_mosaic(self, frames: List[Dict]) -> Tuple[str, str]:
+        """Tile several base64 frames into one labeled image, returning (base64 data, mime type)"""
+        
+        images = [
+            cv2.imdecode(np.frombuffer(base64.b64decode(frame_info['frame_data']), np.uint8), cv2.IMREAD_COLOR)
+            for frame_info in frames
+        ]
+        mosaic = tile_frames(images, config.VISION_MOSAIC_TILE_WIDTH)
+        return encode_frame(mosaic, 0, config.FRAME_IMAGE_FORMAT, config.FRAME_IMAGE_QUALITY)
+    
+    async def _call_vision_model(self, prompt: str, image_data: str, mime_type: str = "image/jpeg") -> str:
+        """Send one prompt + image to Qwen2-VL, respecting the concurrency cap and timeout"""
+        
+        async with self.vision_semaphore:
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(
                     model="Qwen/Qwen2-VL-72B-Instruct",
                     max_tokens=1024,
                     temperature=0.3,
@@ -145,49 +474,67 @@ class VideoProcessor:
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/jpeg;base64,{frame_info['frame_data']}"
+                                        "url": f"data:{mime_type};base64,{image_data}"
                                     }
                                 }
                             ]
                         }
                     ]
-                )
-                
-                ai_response = response.choices[0].message.content
-                print(f"AI response for frame {frame_info['id']}: {ai_response[:200]}...")
-                
-                try:
-                    # Parse JSON response
-                    start_idx = ai_response.find('[')
-                    end_idx = ai_response.rfind(']') + 1
-                    if start_idx != -1 and end_idx != 0:
-                        json_str = ai_response[start_idx:end_idx]
-                        items = json.loads(json_str)
-                        
-                        for item in items:
-                            detected_objects.append({
-                                'timestamp': frame_info['timestamp'],
-                                'frame_id': frame_info['id'],
-                                'frame_data': frame_info['frame_data'],
-                                'object_name': item.get('object_name', 'unknown'),
-                                'category': item.get('category', 'misc'),
-                                'confidence': float(item.get('confidence', 0.8)),
-                                'condition': item.get('condition', 'good'),
-                                'estimated_value': float(item.get('estimated_value', 50)),
-                                'description': item.get('description', ''),
-                                'ai_response': ai_response
-                            })
-                            
-                except json.JSONDecodeError as e:
-                    print(f"JSON parsing error: {e}")
-                    # Fallback: try to extract items from text
-                    self._extract_items_from_text(ai_response, frame_info, detected_objects)
+                ),
+                timeout=config.VISION_FRAME_TIMEOUT
+            )
+        
+        return response.choices[0].message.content
+    
+    def _parse_detection_response(self, ai_response: str, frame_info: Dict, tile_frames: List[Dict] = None) -> List[Dict]:
+        """Turn the vision model's JSON array into detected object dicts
+        
+        With tile_frames (mosaic mode) each item is mapped back to the frame named by its "tile" index.
+        """
+        
+        detected_objects = []
+        
+        try:
+            # Parse JSON response
+            start_idx = ai_response.find('[')
+            end_idx = ai_response.rfind(']') + 1
+            if start_idx != -1 and end_idx != 0:
+                json_str = ai_response[start_idx:end_idx]
+                items = json.loads(json_str)
                 
-            except Exception as e:
-                print(f"Error detecting objects in frame {frame_info['id']}: {str(e)}")
-                continue
+                for item in items:
+                    item_frame = frame_info
+                    if tile_frames is not None:
+                        try:
+                            tile = int(item.get('tile'))
+                        except (TypeError, ValueError):
+                            tile = -1
+                        if not 0 <= tile < len(tile_frames):
+                            print(f"Dropping '{item.get('object_name', 'unknown')}' with unknown tile {item.get('tile')!r}")
+                            continue
+                        item_frame = tile_frames[tile]
+                    
+                    detected_objects.append({
+                        'timestamp': item_frame['timestamp'],
+                        'frame_id': item_frame['id'],
+                        'frame_data': item_frame['frame_data'],
+                        'mime_type': item_frame.get('mime_type', 'image/jpeg'),
+                        'original_frame_data': item_frame.get('original_frame_data'),
+                        'object_name': item.get('object_name', 'unknown'),
+                        'category': item.get('category', 'misc'),
+                        'confidence': float(item.get('confidence', 0.8)),
+                        'condition': item.get('condition', 'good'),
+                        'estimated_value': float(item.get('estimated_value', 50)),
+                        'description': item.get('description', ''),
+                        'bbox': parse_bbox(item.get('bbox')),
+                        'ai_response': ai_response
+                    })
+                    
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing error: {e}")
+            # Fallback: try to extract items from text
+            self._extract_items_from_text(ai_response, frame_info, detected_objects)
         
-        print(f"Detected {len(detected_objects)} objects across all frames")
         return detected_objects
     
     def _extract_items_from_text(self, text: str, frame_info: Dict, detected_objects: List[Dict]):
@@ -202,12 +549,15 @@ class VideoProcessor:
                     'timestamp': frame_info['timestamp'],
                     'frame_id': frame_info['id'],
                     'frame_data': frame_info['frame_data'],
+                    'mime_type': frame_info.get('mime_type', 'image/jpeg'),
+                    'original_frame_data': frame_info.get('original_frame_data'),
                     'object_name': item,
                     'category': self._get_category_for_item(item),
                     'confidence': 0.7,
                     'condition': 'good',
                     'estimated_value': self._estimate_price(item, self._get_category_for_item(item)),
                     'description': f"A {item} visible in the room",
+                    'bbox': None,
                     'ai_response': text
                 })
                 break  # Only add one item per frame as fallback
@@ -244,32 +594,52 @@ class VideoProcessor:
         """Get category suggestions for manual item entry"""
         return self.sellable_categories
     
-    async def filter_sellable_items(self, detected_objects: List[Dict]) -> List[Dict]:
-        """Filter and deduplicate sellable items"""
+
+class SellableItemCollector:
+    """Incrementally groups detected objects into unique sellable items
+    
+    Objects with the same name and category are one item; the most confident detection wins.
+    Item images go into frame_store and items carry frame_ref / original_frame_ref instead.
+    """
+    
+    def __init__(self, frame_store: FrameStore):
+        self.frame_store = frame_store
+        self.unique_items: Dict[str, Dict] = {}
+    
+    @property
+    def items(self) -> List[Dict]:
+        return list(self.unique_items.values())
+    
+    def add(self, obj: Dict) -> Optional[Dict]:
+        """Add a detected object; returns the item if it is new, None if it matched an existing one"""
         
-        # Group similar items and remove duplicates
-        unique_items = {}
+        item_key = f"{obj['object_name']}_{obj['category']}"
+        existing = self.unique_items.get(item_key)
         
-        for obj in detected_objects:
-            item_key = f"{obj['object_name']}_{obj['category']}"
-            
-            # Keep the one with highest confidence
-            if item_key not in unique_items or obj['confidence'] > unique_items[item_key]['confidence']:
-                unique_items[item_key] = {
-                    'id': f"item_{len(unique_items)}",
-                    'name': obj['object_name'],
-                    'category': obj['category'],
-                    'timestamp': obj['timestamp'],
-                    'frame_id': obj['frame_id'],
-                    'frame_data': obj['frame_data'],
-                    'confidence': obj['confidence'],
-                    'estimated_price': obj['estimated_value'],
-                    'condition': obj.get('condition', 'good'),
-                    'description': obj.get('description', f"A {obj['object_name']} in {obj.get('condition', 'good')} condition"),
-                    'ai_response': obj.get('ai_response', '')
-                }
+        # Keep the one with highest confidence
+        if existing and obj['confidence'] <= existing['confidence']:
+            return None
+        
+        item = {
+            'id': existing['id'] if existing else f"item_{len(self.unique_items)}",
+            'name': obj['object_name'],
+            'category': obj['category'],
+            'timestamp': obj['timestamp'],
+            'frame_id': obj['frame_id'],
+            'frame_ref': self.frame_store.put(obj['frame_data'], obj.get('mime_type', 'image/jpeg')),
+            'mime_type': obj.get('mime_type', 'image/jpeg'),
+            'original_frame_ref': self.frame_store.put(obj['original_frame_data']) if obj.get('original_frame_data') else None,
+            'bbox': obj.get('bbox'),
+            'confidence': obj['confidence'],
+            'estimated_price': obj['estimated_value'],
+            'condition': obj.get('condition', 'good'),
+            'description': obj.get('description', f"A {obj['object_name']} in {obj.get('condition', 'good')} condition")
+        }
         
-        sellable_items = list(unique_items.values())
-        print(f"Found {len(sellable_items)} unique sellable items")
+        if existing:
+            # Update in place so anything already holding the item sees the better detection
+            existing.update({key: value for key, value in item.items() if key != 'id'})
+            return None
         
-        return sellable_items
+        self.unique_items[item_key] = item
+        return item
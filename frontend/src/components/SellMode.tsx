@@ -1,4 +1,4 @@
-import React, { useState } from 'react'
+import React, { useRef, useState } from 'react'
 import { motion } from 'framer-motion'
 import { ArrowRight, Video } from 'lucide-react'
 
@@ -14,7 +14,8 @@ interface ExtractedItem {
   category: string
   condition: string
   confidence?: number
-  frame_data?: string
+  frame_ref?: string
+  mime_type?: string
   timestamp?: number
 }
 
@@ -30,6 +31,7 @@ interface Storefront {
 export function SellMode({ onBack }: SellModeProps) {
   const [isUploading, setIsUploading] = useState(false)
   const [uploadProgress, setUploadProgress] = useState(0)
+  const [queuePosition, setQueuePosition] = useState<number | null>(null)
   const [jobId, setJobId] = useState<string | null>(null)
   const [extractedItems, setExtractedItems] = useState<ExtractedItem[]>([])
   const [storefront, setStorefront] = useState<Storefront | null>(null)
@@ -38,6 +40,19 @@ export function SellMode({ onBack }: SellModeProps) {
   const [showLoginForm, setShowLoginForm] = useState(false)
   const [loginCredentials, setLoginCredentials] = useState({ email: '', password: '' })
   const [error, setError] = useState<string | null>(null)
+  // Open status stream and polling timers, so cancelling can stop them
+  const eventSourceRef = useRef<EventSource | null>(null)
+  const pollIntervalRef = useRef<ReturnType<typeof setInterval> | null>(null)
+  const pollTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  const stopWatchingExtraction = () => {
+    eventSourceRef.current?.close()
+    eventSourceRef.current = null
+    if (pollIntervalRef.current) clearInterval(pollIntervalRef.current)
+    if (pollTimeoutRef.current) clearTimeout(pollTimeoutRef.current)
+    pollIntervalRef.current = null
+    pollTimeoutRef.current = null
+  }
 
   const handleVideoUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0]
@@ -64,7 +79,11 @@ export function SellMode({ onBack }: SellModeProps) {
       const data = await response.json()
       setJobId(data.job_id)
       
-      pollExtractionStatus(data.job_id)
+      if (typeof EventSource !== 'undefined') {
+        streamExtractionEvents(data.job_id)
+      } else {
+        pollExtractionStatus(data.job_id)
+      }
       
     } catch (error) {
       console.error('Error uploading video:', error)
@@ -74,46 +93,117 @@ export function SellMode({ onBack }: SellModeProps) {
     }
   }
 
+  const streamExtractionEvents = (jobId: string) => {
+    // The browser reconnects on its own and sends Last-Event-ID, so only missed events are replayed
+    const source = new EventSource(`http://localhost:8000/api/sell/jobs/${jobId}/events`)
+    eventSourceRef.current = source
+    let items: ExtractedItem[] = []
+    
+    const handleStatus = (data: any) => {
+      if (data.progress !== undefined) setUploadProgress(data.progress)
+      if (data.queue_position !== undefined) setQueuePosition(data.queue_position)
+      if (data.items) {
+        items = data.items
+        setExtractedItems(items)
+      }
+      
+      if (data.status === 'completed') {
+        stopWatchingExtraction()
+        setIsUploading(false)
+        setCurrentStep('items')
+      } else if (data.status === 'cancelled') {
+        stopWatchingExtraction()
+        resetToUpload()
+      } else if (data.status === 'failed') {
+        stopWatchingExtraction()
+        setIsUploading(false)
+        setCurrentStep('upload')
+        setError(data.error || 'Extraction failed')
+      }
+    }
+    
+    source.addEventListener('snapshot', (event) => handleStatus(JSON.parse((event as MessageEvent).data)))
+    source.addEventListener('status', (event) => handleStatus(JSON.parse((event as MessageEvent).data)))
+    source.addEventListener('queue', (event) => {
+      setQueuePosition(JSON.parse((event as MessageEvent).data).queue_position)
+    })
+    source.addEventListener('progress', (event) => {
+      setUploadProgress(JSON.parse((event as MessageEvent).data).progress)
+    })
+    source.addEventListener('item', (event) => {
+      items = [...items, JSON.parse((event as MessageEvent).data)]
+      setExtractedItems(items)
+    })
+    
+    source.onerror = () => {
+      // Closed for good (e.g. the server refused the stream): fall back to polling
+      if (source.readyState === EventSource.CLOSED && eventSourceRef.current === source) {
+        eventSourceRef.current = null
+        pollExtractionStatus(jobId)
+      }
+    }
+  }
+
   const pollExtractionStatus = async (jobId: string) => {
+    // Only fields changed since the last seen version come back; 304 when nothing changed
+    let version: number | null = null
+    let etag: string | null = null
+    const data: any = {}
+    
     const interval = setInterval(async () => {
       try {
-        const response = await fetch(`http://localhost:8000/api/sell/extraction-status/${jobId}`)
+        const query = version === null ? '' : `?since=${version}`
+        const response = await fetch(`http://localhost:8000/api/sell/extraction-status/${jobId}${query}`, {
+          headers: etag ? { 'If-None-Match': etag } : {}
+        })
         
+        if (response.status === 304) {
+          return
+        }
         if (!response.ok) {
           throw new Error(`Failed to get status: ${response.statusText}`)
         }
         
-        const data = await response.json()
+        etag = response.headers.get('ETag')
+        Object.assign(data, await response.json())
+        version = data.version
         setUploadProgress(data.progress || 0)
+        setQueuePosition(data.queue_position ?? null)
         
         if (data.status === 'completed') {
-          clearInterval(interval)
+          stopWatchingExtraction()
           setIsUploading(false)
           setExtractedItems(data.items || [])
           setCurrentStep('items')
+        } else if (data.status === 'cancelled') {
+          stopWatchingExtraction()
+          resetToUpload()
         } else if (data.status === 'failed') {
-          clearInterval(interval)
+          stopWatchingExtraction()
           setIsUploading(false)
           setCurrentStep('upload')
           setError(data.error || 'Extraction failed')
         }
       } catch (error) {
         console.error('Error polling status:', error)
-        clearInterval(interval)
+        stopWatchingExtraction()
         setIsUploading(false)
         setCurrentStep('upload')
         setError(error instanceof Error ? error.message : 'Failed to check status')
       }
     }, 1000)
 
-    setTimeout(() => {
-      clearInterval(interval)
+    const timeout = setTimeout(() => {
+      stopWatchingExtraction()
       if (isUploading) {
         setIsUploading(false)
         setCurrentStep('upload')
         setError('Processing timed out')
       }
     }, 300000)
+    
+    pollIntervalRef.current = interval
+    pollTimeoutRef.current = timeout
   }
 
   const createStorefront = async () => {
@@ -216,11 +306,22 @@ export function SellMode({ onBack }: SellModeProps) {
     }
   }
 
+  const cancelProcessing = () => {
+    // Stop listening first, so the "cancelled" status that follows isn't shown as a failure
+    stopWatchingExtraction()
+    if (jobId) {
+      fetch(`http://localhost:8000/api/sell/jobs/${jobId}`, { method: 'DELETE' })
+        .catch((error) => console.error('Error cancelling extraction:', error))
+    }
+    resetToUpload()
+  }
+
   const resetToUpload = () => {
     setCurrentStep('upload')
     setError(null)
     setIsUploading(false)
     setUploadProgress(0)
+    setQueuePosition(null)
     setJobId(null)
     setExtractedItems([])
     setStorefront(null)
@@ -339,7 +440,8 @@ export function SellMode({ onBack }: SellModeProps) {
                     </div>
                     
                     <p className="text-body text-white/60">
-                      {uploadProgress < 30 ? 'Extracting frames from video...' : 
+                      {queuePosition ? `Waiting for a free slot (position ${queuePosition} in line)...` :
+                       uploadProgress < 30 ? 'Extracting frames from video...' : 
                        uploadProgress < 60 ? 'Detecting objects with AI...' : 
                        uploadProgress < 80 ? 'Filtering sellable items...' : 
                        uploadProgress < 100 ? 'Finalizing results...' :
@@ -347,7 +449,7 @@ export function SellMode({ onBack }: SellModeProps) {
                     </p>
 
                     <button
-                      onClick={resetToUpload}
+                      onClick={cancelProcessing}
                       className="btn-secondary mt-4"
                     >
                       Cancel
@@ -386,9 +488,9 @@ export function SellMode({ onBack }: SellModeProps) {
 
                     <div className="space-y-4">
                       <div className="aspect-video bg-white/5 rounded-lg flex items-center justify-center">
-                        {item.frame_data ? (
+                        {item.frame_ref ? (
                           <img 
-                            src={`data:image/jpeg;base64,${item.frame_data}`} 
+                            src={`http://localhost:8000/api/sell/images/${item.frame_ref}`} 
                             alt={item.name}
                             className="w-full h-full object-cover rounded-lg"
                           />